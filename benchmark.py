@@ -0,0 +1,446 @@
+"""
+Mediciones de rendimiento del gestor de inventario.
+
+Uso:
+    python benchmark.py memoria [--n 100000]
+    python benchmark.py estres [--hilos 16] [--operaciones 2000]
+    python benchmark.py columnar [--n 100000]   (requiere NumPy)
+    python benchmark.py metricas [--n 10000] [--operaciones 200000]
+    python benchmark.py servicio [--n 10000] [--clientes 50] [--segundos 5] [--escrituras 0.2]
+    python benchmark.py suite [--tamanos 1000 10000 100000 1000000] [--almacen journal] [--salida r.json]
+    python benchmark.py comparar antes.json despues.json [--umbral 0.10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from main import (AlmacenJournal, AlmacenJSON, AlmacenProductos, AlmacenSQLite, Discos, Inventario,
+                  InventarioAsincrono, Metricas, TIPOS_PRODUCTO, producto_desde_dict, servir)
+
+GENEROS = ["rock", "pop", "jazz", "tango", "folklore", "novela", "ensayo", "poesía"]
+PERIODICIDADES = ["semanal", "quincenal", "mensual"]
+
+
+def generar_catalogo(n, semilla=0):     #genera n registros sintéticos (mezcla de discos, libros y revistas)
+    azar = random.Random(semilla)
+    for i in range(1, n + 1):
+        base = {"nombre": f"Producto {i}", "precio": round(azar.uniform(1, 500), 2),
+                "stock": azar.randint(0, 1000), "id": i}
+        resto = i % 3
+        if resto == 0:
+            base.update(tipo="disco", artista=f"Artista {i % 997}", genero=azar.choice(GENEROS))
+        elif resto == 1:
+            base.update(tipo="libro", autor=f"Autor {i % 991}", genero=azar.choice(GENEROS))
+        else:
+            base.update(tipo="revista", tema=f"Tema {i % 101}", periodicidad=azar.choice(PERIODICIDADES))
+        yield base
+
+
+class _ProductoConDict:     #representación anterior: atributos en el __dict__ de cada instancia
+    def __init__(self, datos):
+        for campo, valor in datos.items():
+            setattr(self, campo, valor)
+
+_CLASES_CON_DICT = {nombre: type(tipo.clase.__name__ + "ConDict", (_ProductoConDict,), {})
+                    for nombre, tipo in TIPOS_PRODUCTO.items()}
+
+
+def _bytes_por_producto(construir, registros):
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    productos = [construir(datos) for datos in registros]
+    usados = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    return usados / len(productos)
+
+
+def medir_memoria(n):   #bytes por producto con __dict__ (antes) y con __slots__ (ahora)
+    registros = list(generar_catalogo(n))  # Los valores se comparten entre ambas mediciones
+    antes = _bytes_por_producto(lambda d: _CLASES_CON_DICT[d["tipo"]](d), registros)
+    ahora = _bytes_por_producto(producto_desde_dict, registros)
+    print(f"Productos: {n}")
+    print(f"  Con __dict__:  {antes:.1f} bytes por producto")
+    print(f"  Con __slots__: {ahora:.1f} bytes por producto")
+    print(f"  Reducción:     {100 * (1 - ahora / antes):.1f}%")
+    return {"n": n, "bytes_con_dict": antes, "bytes_con_slots": ahora}
+
+
+def estres_concurrente(hilos, operaciones, productos=20):   #muchos hilos ajustando stock: no debe perderse ninguna actualización
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "productos.json")
+        with contextlib.redirect_stdout(io.StringIO()):  # Silencia los mensajes por producto
+            inventario = Inventario(ruta, journal=True, fsync_cada=1000, concurrente=True)
+            inventario.cargar_lote(generar_catalogo(productos))
+        stock_inicial = sum(p.stock for p in inventario.productos)
+        errores = []
+        barrera = threading.Barrier(hilos)
+
+        def trabajar(semilla):
+            azar = random.Random(semilla)
+            barrera.wait()
+            try:
+                for _ in range(operaciones):
+                    id_producto = azar.randint(1, productos)
+                    if azar.random() < 0.5:
+                        inventario.ajustar_stock(id_producto, 1)
+                    else:
+                        inventario.buscar_por_id(id_producto)
+                        inventario.ajustar_stock(id_producto, 1)
+                        len(inventario.productos)
+            except Exception as e:
+                errores.append(e)
+
+        trabajadores = [threading.Thread(target=trabajar, args=(i,)) for i in range(hilos)]
+        inicio = time.perf_counter()
+        for hilo in trabajadores:
+            hilo.start()
+        for hilo in trabajadores:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        esperado = stock_inicial + hilos * operaciones
+        obtenido = sum(p.stock for p in inventario.productos)
+        inventario.cerrar()
+        with contextlib.redirect_stdout(io.StringIO()):
+            en_disco = sum(p.stock for p in Inventario(ruta, journal=True).productos)
+    print(f"Hilos: {hilos}, ajustes por hilo: {operaciones}, duración: {duracion:.2f}s")
+    print(f"  Stock esperado: {esperado}, en memoria: {obtenido}, en disco: {en_disco}")
+    if errores:
+        print(f"  Errores: {errores[:3]}")
+    correcto = not errores and esperado == obtenido == en_disco
+    print("  Sin actualizaciones perdidas." if correcto else "  ¡Se perdieron actualizaciones!")
+    return correcto
+
+
+class AlmacenMemoria(AlmacenProductos):     #sin disco: mide solo el costo en memoria de cada operación
+    def __init__(self, registros=None):
+        self.registros = registros or []
+
+    def cargar(self):
+        return self.registros
+
+    def guardar_todo(self, productos):
+        pass
+
+
+def _inventario_en_memoria(n, metricas=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        inventario = Inventario(almacen=AlmacenMemoria(), metricas=metricas)
+        inventario.cargar_lote(generar_catalogo(n))
+    return inventario
+
+
+def medir_columnar(n):   #subir 10% el precio de los discos de rock: bucle con actualizar vs vista columnar
+    inventario = _inventario_en_memoria(n)
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for producto in inventario.productos:
+            if producto.tipo == "disco" and producto.genero == "rock":
+                inventario.actualizar(producto.id, {"precio": producto.precio * 1.1})
+    bucle = time.perf_counter() - inicio
+
+    inventario = _inventario_en_memoria(n)
+    inicio = time.perf_counter()
+    vista = inventario.vista_columnar()
+    instantanea = time.perf_counter() - inicio
+    mascara = vista.mascara(tipo="disco", genero="rock")
+    vista.precio[mascara] *= 1.1
+    cambiados = inventario.aplicar_columnas(vista)
+    columnar = time.perf_counter() - inicio
+    print(f"Productos: {n}, discos de rock modificados: {cambiados}")
+    print(f"  Bucle con actualizar: {bucle:.3f}s")
+    print(f"  Vista columnar:       {columnar:.3f}s (instantánea {instantanea:.3f}s)")
+    return {"n": n, "modificados": cambiados, "bucle_s": bucle, "columnar_s": columnar}
+
+
+def medir_metricas(n, operaciones):   #costo por llamada sin métricas, y con métricas en memoria
+    resultados = {}
+    for nombre, metricas in (("sin_metricas", None), ("con_metricas", Metricas())):
+        inventario = _inventario_en_memoria(n, metricas)
+        ids = [random.Random(0).randint(1, n) for _ in range(1000)]
+        inicio = time.perf_counter()
+        for i in range(operaciones):
+            inventario.buscar_por_id(ids[i % len(ids)])
+        busqueda = (time.perf_counter() - inicio) / operaciones
+        inicio = time.perf_counter()
+        for i in range(operaciones // 10):
+            inventario.ajustar_stock(ids[i % len(ids)], 1)
+        ajuste = (time.perf_counter() - inicio) / (operaciones // 10)
+        resultados[nombre] = {"buscar_por_id_ns": busqueda * 1e9, "ajustar_stock_ns": ajuste * 1e9}
+        print(f"{nombre:<13} buscar_por_id {busqueda * 1e9:8.0f} ns   ajustar_stock {ajuste * 1e9:8.0f} ns")
+    return resultados
+
+
+async def _pedir(lector, escritor, metodo, ruta, cuerpo=b""):   #una petición HTTP/1.1 sobre una conexión abierta
+    escritor.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: local\r\nContent-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo)
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await lector.readline()
+        if linea == b"\r\n":
+            break
+        if linea.lower().startswith(b"content-length:"):
+            largo = int(linea.split(b":")[1])
+        if not linea:
+            raise ConnectionError("El servidor cerró la conexión")
+    await lector.readexactly(largo)
+    return estado
+
+
+async def _cliente(puerto, n, escrituras, fin, latencias, errores, semilla):
+    azar = random.Random(semilla)
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    try:
+        while time.perf_counter() < fin:
+            id_producto = azar.randint(1, n)
+            inicio = time.perf_counter()
+            if azar.random() < escrituras:
+                estado = await _pedir(lector, escritor, "POST", f"/productos/{id_producto}/stock", b'{"delta": 1}')
+            else:
+                estado = await _pedir(lector, escritor, "GET", f"/productos/{id_producto}")
+            latencias.append(time.perf_counter() - inicio)
+            if estado != 200:
+                errores.append(estado)
+    finally:
+        escritor.close()
+
+
+async def _carga_servicio(directorio, n, clientes, segundos, escrituras):
+    ruta = os.path.join(directorio, "productos.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        AlmacenJSON(ruta).guardar_todo(producto_desde_dict(d) for d in generar_catalogo(n))
+        metricas = Metricas()
+        servicio = await InventarioAsincrono.abrir(ruta, journal=True, metricas=metricas)
+        servidor = await servir(servicio, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        latencias, errores = [], []
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_cliente(puerto, n, escrituras, inicio + segundos, latencias, errores, i)
+                               for i in range(clientes)))
+        duracion = time.perf_counter() - inicio
+        servidor.close()
+        await servidor.wait_closed()
+        await servicio.cerrar()
+    contadores = metricas.resumen()["contadores"]
+    latencias.sort()
+    resultado = {"peticiones": len(latencias), "peticiones_por_s": len(latencias) / duracion,
+                 "p50_ms": 1000 * _percentil(latencias, 0.50), "p99_ms": 1000 * _percentil(latencias, 0.99),
+                 "errores": len(errores), "cambios_guardados": contadores.get("cambios_persistidos", 0),
+                 "grupos_guardados": servicio.grupos_guardados}
+    print(f"{clientes} clientes, {segundos}s, {escrituras:.0%} escrituras, {n} productos")
+    print(f"  {resultado['peticiones']} peticiones ({resultado['peticiones_por_s']:.0f}/s), "
+          f"p50 {resultado['p50_ms']:.2f} ms, p99 {resultado['p99_ms']:.2f} ms, {resultado['errores']} errores")
+    print(f"  {resultado['cambios_guardados']} cambios guardados en {resultado['grupos_guardados']} escrituras")
+    return resultado
+
+
+def carga_servicio(n, clientes, segundos, escrituras):   #prueba de carga del servicio HTTP con clientes concurrentes
+    with tempfile.TemporaryDirectory() as directorio:
+        return asyncio.run(_carga_servicio(directorio, n, clientes, segundos, escrituras))
+
+
+ALMACENES = ("memoria", "json", "journal", "sqlite")
+
+
+def _crear_almacen(tipo, directorio, registros=None):
+    ruta = os.path.join(directorio, "productos.json")
+    if tipo == "memoria":
+        return AlmacenMemoria(registros)
+    if tipo == "json":
+        return AlmacenJSON(ruta)
+    if tipo == "journal":
+        return AlmacenJournal(ruta)
+    return AlmacenSQLite(os.path.join(directorio, "productos.db"))
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def _resultado(n, almacen, operacion, duraciones, pico_memoria=None):
+    ordenados = sorted(duraciones)
+    total = sum(duraciones)
+    return {"n": n, "almacen": almacen, "operacion": operacion, "muestras": len(duraciones),
+            "ops_por_s": len(duraciones) / total if total else None,
+            "p50_ms": 1000 * _percentil(ordenados, 0.50), "p95_ms": 1000 * _percentil(ordenados, 0.95),
+            "p99_ms": 1000 * _percentil(ordenados, 0.99), "pico_memoria_bytes": pico_memoria}
+
+
+def _medir(operacion, argumentos):   #duración de cada llamada, en segundos
+    duraciones = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        operacion(*args)
+        duraciones.append(time.perf_counter() - inicio)
+    return duraciones
+
+
+def _pico_memoria(operacion):   #pico de memoria asignada durante una llamada (tracemalloc)
+    tracemalloc.start()
+    try:
+        operacion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir_tamano(n, almacen, muestras, con_memoria=True):   #todas las operaciones sobre un catálogo de n productos
+    resultados = []
+    azar = random.Random(n)
+    with tempfile.TemporaryDirectory() as directorio, contextlib.redirect_stdout(io.StringIO()):
+        registros = list(generar_catalogo(n))
+        base = _crear_almacen(almacen, directorio, registros)
+        if almacen != "memoria":
+            base.guardar_todo(producto_desde_dict(d) for d in registros)
+            base.cerrar()
+
+        abrir = lambda: Inventario(almacen=_crear_almacen(almacen, directorio, registros))
+        inventario = None
+
+        def cargar():
+            nonlocal inventario
+            if inventario is not None:
+                inventario.cerrar()
+            inventario = abrir()
+        repeticiones = 3 if n <= 100000 else 1
+        duraciones = _medir(cargar, [()] * repeticiones)
+        pico = _pico_memoria(cargar) if con_memoria else None
+        resultados.append(_resultado(n, almacen, "cargar", duraciones, pico))
+
+        duraciones = _medir(inventario.guardar_productos_json, [()] * repeticiones)
+        pico = _pico_memoria(inventario.guardar_productos_json) if con_memoria else None
+        resultados.append(_resultado(n, almacen, "guardar", duraciones, pico))
+
+        ids = [azar.randint(1, n) for _ in range(muestras)]
+        resultados.append(_resultado(n, almacen, "buscar_por_id", _medir(inventario.buscar_por_id, [(i,) for i in ids])))
+
+        nuevos = [(Discos(f"Nuevo {i}", 10.0, 5, None, "Artista nuevo", "rock"),) for i in range(muestras)]
+        resultados.append(_resultado(n, almacen, "crear", _medir(inventario.crear, nuevos)))
+
+        resultados.append(_resultado(n, almacen, "actualizar", _medir(
+            inventario.actualizar, [(i, {"precio": azar.uniform(1, 500)}) for i in ids])))
+
+        resultados.append(_resultado(n, almacen, "consultar", _medir(
+            lambda: list(inventario.consultar(tipo="disco", genero="rock", orden="precio", limite=20)),
+            [()] * min(muestras, 100))))
+
+        resultados.append(_resultado(n, almacen, "listar_pagina", _medir(
+            lambda pagina: inventario.listar(pagina=pagina, salida=io.StringIO()),
+            [(azar.randrange(max(n // 20, 1)),) for _ in range(min(muestras, 100))])))
+
+        resultados.append(_resultado(n, almacen, "listar_todo", _medir(
+            lambda: inventario.listar(salida=io.StringIO()), [()] * repeticiones)))
+
+        eliminar = list(dict.fromkeys(ids))
+        resultados.append(_resultado(n, almacen, "eliminar", _medir(inventario.eliminar, [(i,) for i in eliminar])))
+        inventario.cerrar()
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def ejecutar_suite(tamanos, almacen, muestras, salida=None, con_memoria=True):   #resultados en JSON para comparar entre commits
+    resultados = []
+    for n in tamanos:
+        print(f"Midiendo {n} productos ({almacen})...", file=sys.stderr)
+        for fila in medir_tamano(n, almacen, muestras, con_memoria):
+            resultados.append(fila)
+            print(f"  {fila['operacion']:<14} {fila['ops_por_s'] or 0:>12.1f} ops/s  "
+                  f"p50 {fila['p50_ms']:.3f} ms  p95 {fila['p95_ms']:.3f} ms  p99 {fila['p99_ms']:.3f} ms", file=sys.stderr)
+    informe = {"commit": _commit_actual(), "python": platform.python_version(), "plataforma": platform.platform(),
+               "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "resultados": resultados}
+    if salida:
+        with open(salida, "w") as file:
+            json.dump(informe, file, indent=4)
+    else:
+        json.dump(informe, sys.stdout, indent=4)
+        print()
+    return informe
+
+
+def comparar(ruta_antes, ruta_despues, umbral=0.10):   #compara dos informes de la suite; True si no hay regresiones
+    with open(ruta_antes) as file:
+        antes = {(r["n"], r["almacen"], r["operacion"]): r for r in json.load(file)["resultados"]}
+    with open(ruta_despues) as file:
+        despues = json.load(file)["resultados"]
+    regresiones = 0
+    for fila in despues:
+        anterior = antes.get((fila["n"], fila["almacen"], fila["operacion"]))
+        if anterior is None or not anterior["p50_ms"]:
+            continue
+        cambio = fila["p50_ms"] / anterior["p50_ms"] - 1
+        marca = ""
+        if cambio > umbral:
+            marca = "  <-- regresión"
+            regresiones += 1
+        print(f"{fila['n']:>8} {fila['almacen']:<8} {fila['operacion']:<14} "
+              f"p50 {anterior['p50_ms']:.3f} -> {fila['p50_ms']:.3f} ms ({cambio:+.1%}){marca}")
+    print(f"{regresiones} regresiones por encima del {umbral:.0%}.")
+    return not regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del gestor de inventario")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    memoria = subparsers.add_parser("memoria", help="bytes por producto antes y después de __slots__")
+    memoria.add_argument("--n", type=int, default=100000)
+    estres = subparsers.add_parser("estres", help="prueba de estrés del modo concurrente")
+    estres.add_argument("--hilos", type=int, default=16)
+    estres.add_argument("--operaciones", type=int, default=2000)
+    columnar = subparsers.add_parser("columnar", help="cambio de precios masivo: bucle vs NumPy")
+    columnar.add_argument("--n", type=int, default=100000)
+    metricas = subparsers.add_parser("metricas", help="costo de la instrumentación por operación")
+    metricas.add_argument("--n", type=int, default=10000)
+    metricas.add_argument("--operaciones", type=int, default=200000)
+    servicio = subparsers.add_parser("servicio", help="prueba de carga del servicio HTTP asíncrono")
+    servicio.add_argument("--n", type=int, default=10000)
+    servicio.add_argument("--clientes", type=int, default=50)
+    servicio.add_argument("--segundos", type=float, default=5)
+    servicio.add_argument("--escrituras", type=float, default=0.2, help="fracción de peticiones que ajustan stock")
+    suite = subparsers.add_parser("suite", help="CRUD, carga, guardado y listado a distintas escalas")
+    suite.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    suite.add_argument("--almacen", choices=ALMACENES, default="journal")
+    suite.add_argument("--muestras", type=int, default=1000, help="operaciones medidas por tipo")
+    suite.add_argument("--salida", help="archivo JSON con los resultados (por defecto, la salida estándar)")
+    suite.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria (más rápido)")
+    comparacion = subparsers.add_parser("comparar", help="compara dos resultados de la suite")
+    comparacion.add_argument("antes")
+    comparacion.add_argument("despues")
+    comparacion.add_argument("--umbral", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.comando == "memoria":
+        medir_memoria(args.n)
+    elif args.comando == "estres":
+        if not estres_concurrente(args.hilos, args.operaciones):
+            sys.exit(1)
+    elif args.comando == "columnar":
+        medir_columnar(args.n)
+    elif args.comando == "metricas":
+        medir_metricas(args.n, args.operaciones)
+    elif args.comando == "servicio":
+        carga_servicio(args.n, args.clientes, args.segundos, args.escrituras)
+    elif args.comando == "suite":
+        ejecutar_suite(args.tamanos, args.almacen, args.muestras, args.salida, not args.sin_memoria)
+    elif args.comando == "comparar":
+        if not comparar(args.antes, args.despues, args.umbral):
+            sys.exit(1)
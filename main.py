@@ -106,10 +106,41 @@ del Excel con dudas que necesiten despejar.
 """
 
 
+import argparse
+import asyncio
+import bisect
+import csv
+import functools
+import heapq
+import io
+import itertools
 import json
+import logging
+import math
+import mmap
+import operator
 import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import types
+import unicodedata
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    import numpy as np
+except ImportError:  # Dependencia opcional: solo la usa VistaColumnar
+    np = None
 
 class Productos:     #creación de la clase base Productos
+    # __slots__ evita el __dict__ por instancia: con catálogos grandes es la mayor parte de la memoria
+    __slots__ = ("tipo", "nombre", "precio", "stock", "id")
+
     def __init__(self, tipo, nombre, precio, stock, id=None):
         self.tipo = tipo
         self.nombre = nombre
@@ -118,6 +149,9 @@ class Productos:     #creación de la clase base Productos
         self.id = id
 
     def to_dict(self):     #convierte la instancia en un diccionario mejor para serializar a JSON
+        tipo = TIPOS_POR_CLASE.get(type(self))
+        if tipo is not None:  # Tipos registrados: ruta rápida compilada con sus campos (ver TipoProducto)
+            return tipo.a_dict(self)
         return {
             "tipo": self.tipo,
             "nombre": self.nombre,
@@ -128,160 +162,1555 @@ class Productos:     #creación de la clase base Productos
 
     @classmethod
     def from_dict(cls, data): #convierte un diccionario en una instancia de la clase
+        tipo = TIPOS_POR_CLASE.get(cls)
+        if tipo is not None:  # Tipos registrados: ruta rápida compilada (ver TipoProducto)
+            return tipo.desde_dict(data)
         return cls(
             tipo=data["tipo"],
             nombre=data["nombre"],
             precio=data["precio"],
             stock=data["stock"],
-            id=data["id"]
+            id=data.get("id")
         )
 
 class Discos(Productos):
+    __slots__ = ("artista", "genero")
+
     def __init__(self, nombre, precio, stock, id=None, artista=None, genero=None):
         super().__init__("disco", nombre, precio, stock, id)
         self.artista = artista
         self.genero = genero
 
-    def to_dict(self):
-        data = super().to_dict()
-        data.update({
-            "artista": self.artista,
-            "genero": self.genero
-        })
-        return data
-
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            nombre=data["nombre"],
-            precio=data["precio"],
-            stock=data["stock"],
-            id=data["id"],
-            artista=data["artista"],
-            genero=data["genero"]
-        )
-
 class Libro(Productos):
+    __slots__ = ("autor", "genero")
+
     def __init__(self, nombre, precio, stock, id=None, autor=None, genero=None):
         super().__init__("libro", nombre, precio, stock, id)
         self.autor = autor
         self.genero = genero
 
-    def to_dict(self):
-        data = super().to_dict()
-        data.update({
-            "autor": self.autor,
-            "genero": self.genero
-        })
-        return data
-
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            nombre=data["nombre"],
-            precio=data["precio"],
-            stock=data["stock"],
-            id=data["id"],
-            autor=data["autor"],
-            genero=data["genero"]
-        )
-
 class Revistas(Productos):
+    __slots__ = ("tema", "periodicidad")
+
     def __init__(self, nombre, precio, stock, id=None, tema=None, periodicidad=None):
         super().__init__("revista", nombre, precio, stock, id)
         self.tema = tema
         self.periodicidad = periodicidad
 
-    def to_dict(self):
-        data = super().to_dict()
-        data.update({
-            "tema": self.tema,
-            "periodicidad": self.periodicidad
-        })
-        return data
+def _enumerar(palabras, conjuncion="y"):   #["a", "b", "c"] -> "a, b y c"
+    palabras = list(palabras)
+    if len(palabras) < 2:
+        return "".join(palabras)
+    return f"{', '.join(palabras[:-1])} {conjuncion} {palabras[-1]}"
 
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            nombre=data["nombre"],
-            precio=data["precio"],
-            stock=data["stock"],
-            id=data["id"],
-            tema=data["tema"],
-            periodicidad=data["periodicidad"]
-        )
+def _tupla(obtener, campos):   #itemgetter/attrgetter que siempre devuelve una tupla, aun con 0 o 1 campos
+    if not campos:
+        return lambda objeto: ()
+    if len(campos) == 1:
+        unico = obtener(campos[0])
+        return lambda objeto: (unico(objeto),)
+    return obtener(*campos)
 
-class Inventario:       #METODOS DE CRUD
-    def __init__(self):
-        self.productos = []
-        self.file_path = "productos.json"
-        self.cargar_productos_json()
+PESO_NOMBRE = 3   # peso del nombre en la búsqueda de texto, para todos los tipos
 
-    def crear(self, producto):    #1 Agregar un nuevo producto
+class TipoProducto:     #esquema de un tipo de producto: se declara una vez y se registra con registrar_tipo
+    # campos: atributos propios (todos obligatorios) -> etiqueta, en el orden del constructor de la
+    # clase, que debe ser clase(nombre, precio, stock, id, *campos) y solo asignar esos atributos
+    # (to_dict y from_dict los resuelve el tipo, la clase no los define).
+    # articulo y femeninos arman los mensajes y las preguntas del menú ("la periodicidad de la
+    # revista"). indices: campos con índice secundario. validadores: funciones extra
+    # producto -> None que lanzan ValueError. pesos_texto: campos propios que entran en la
+    # búsqueda de texto -> peso en el ranking (el nombre siempre entra, con PESO_NOMBRE).
+    def __init__(self, nombre, clase, campos, articulo="el", femeninos=(), indices=(), validadores=(),
+                 pesos_texto=()):
+        for campo in campos:
+            if not campo.isidentifier():
+                raise ValueError(f"Nombre de campo no válido: {campo!r}.")
+        pesos_texto = dict(pesos_texto)
+        for campo in pesos_texto:
+            if campo not in campos:
+                raise ValueError(f"El campo {campo!r} de pesos_texto no es un campo de {nombre}.")
+        self.nombre = nombre
+        self.clase = clase
+        self.etiquetas = dict(campos)
+        self.campos = tuple(self.etiquetas)
+        self.articulo = articulo
+        self.femeninos = frozenset(femeninos)
+        self.indices = tuple(indices)
+        self.validadores = tuple(validadores)
+        self.pesos_texto = {"nombre": PESO_NOMBRE, **pesos_texto}
+        self.detalle_texto = "  " + ", ".join(f"{etiqueta}: {{{campo}}}" for campo, etiqueta in self.etiquetas.items()) + "\n"
+        self.mensaje_requeridos = (f"{articulo.capitalize()} {nombre} debe tener "
+                                   + _enumerar(("una " if campo in self.femeninos else "un ") + etiqueta.lower()
+                                               for campo, etiqueta in self.etiquetas.items()) + ".")
+        # Rutas rápidas: la extracción de campos la hacen itemgetter/attrgetter (en C), sin un
+        # getattr o data[...] por campo en Python
+        self._propios = _tupla(operator.attrgetter, self.campos)
+        self.desde_dict = self._compilar_desde_dict()
+        self.a_dict = self._compilar_a_dict()
+
+    def pregunta(self, campo, nuevo=False):   #"el artista del disco", "la nueva periodicidad de la revista"
+        femenino = campo in self.femeninos
+        articulo = "la" if femenino else "el"
+        if nuevo:
+            articulo += " nueva" if femenino else " nuevo"
+        return f"{articulo} {self.etiquetas[campo].lower()} {'de la' if self.articulo == 'la' else 'del'} {self.nombre}"
+
+    def _compilar_desde_dict(self):   #función data -> producto generada para este tipo
+        # Como hacen dataclasses y namedtuple, se genera el código con los campos ya escritos:
+        # sin pasar por __init__/super() y con una sola asignación múltiple. KeyError si falta
+        # un campo, igual que el from_dict original.
+        destinos = ", ".join(f"producto.{campo}" for campo in ("nombre", "precio", "stock") + self.campos)
+        fuente = ("def desde_dict(data):\n"
+                  "    producto = _nuevo(_clase)\n"
+                  "    producto.tipo = _tipo\n"
+                  f"    {destinos} = _argumentos(data)\n"
+                  "    producto.id = data.get('id')\n"
+                  "    return producto\n")
+        entorno = {"_nuevo": self.clase.__new__, "_clase": self.clase, "_tipo": self.nombre,
+                   "_argumentos": operator.itemgetter("nombre", "precio", "stock", *self.campos)}
+        exec(fuente, entorno)
+        return entorno["desde_dict"]
 
-        # Validaciones generales
-        if not isinstance(producto, (Discos, Libro, Revistas)):
-            raise TypeError("El producto debe ser una instancia de Discos, Libro o Revistas.")
+    def _compilar_a_dict(self):   #función producto -> data generada para este tipo (la usa to_dict)
+        # Un solo literal de diccionario con las claves en el orden de siempre: base y luego los
+        # campos propios, así la clase del tipo no necesita su propio to_dict
+        claves = ("tipo", "nombre", "precio", "stock", "id") + self.campos
+        fuente = ("def a_dict(producto):\n"
+                  "    return {" + ", ".join(f"{clave!r}: producto.{clave}" for clave in claves) + "}\n")
+        entorno = {}
+        exec(fuente, entorno)
+        return entorno["a_dict"]
+
+    def validar(self, producto):
+        if not isinstance(producto, self.clase):
+            raise TypeError(f"El producto debe ser una instancia de {self.clase.__name__}.")
         if not producto.nombre:
             raise ValueError("El nombre del producto no puede estar vacío.")
-        if not producto.tipo or producto.tipo not in ["disco", "libro", "revista"]:
-            raise ValueError("El tipo de producto debe ser 'disco', 'libro' o 'revista'.")
         if producto.stock < 0:
             raise ValueError("El stock no puede ser negativo.")
         if producto.precio < 0:
             raise ValueError("El precio no puede ser negativo.")
+        if not all(self._propios(producto)):
+            raise ValueError(self.mensaje_requeridos)
+        for validador in self.validadores:
+            validador(producto)
+
+# Registro de tipos: nombre -> TipoProducto. Las tablas de abajo se derivan de él y se
+# mantienen al registrar un tipo nuevo, así el resto del módulo no conoce tipos concretos.
+TIPOS_PRODUCTO = {}
+TIPOS_POR_CLASE = {}
+CAMPOS_POR_TIPO = {}        # campos propios de cada tipo además de los de Productos
+INDICES_SECUNDARIOS = {}    # campos con índice secundario por tipo (valor -> ids de productos)
+DETALLE_TEXTO = {}          # segunda línea del listado en texto para cada tipo
+CAMPOS_CONSULTABLES = set(Productos.__slots__)   # atributos por los que se puede filtrar u ordenar en consultar
+PESOS_TEXTO = {}            # campos de la búsqueda de texto y su peso en el ranking, por tipo
+# Columnas de un producto en formatos tabulares (SQLite, CSV): las de Productos y a continuación
+# los campos de cada tipo registrado. Se extiende en el lugar, así quien la importó ve las nuevas
+COLUMNAS_PRODUCTO = ["id", "tipo", "nombre", "precio", "stock"]
+
+def registrar_tipo(tipo):   #los inventarios creados después ya indexan el tipo nuevo
+    TIPOS_PRODUCTO[tipo.nombre] = tipo
+    TIPOS_POR_CLASE[tipo.clase] = tipo
+    CAMPOS_POR_TIPO[tipo.nombre] = tipo.campos
+    if tipo.indices:
+        INDICES_SECUNDARIOS[tipo.nombre] = tipo.indices
+    DETALLE_TEXTO[tipo.nombre] = tipo.detalle_texto
+    CAMPOS_CONSULTABLES.update(tipo.campos)
+    PESOS_TEXTO[tipo.nombre] = tipo.pesos_texto
+    COLUMNAS_PRODUCTO.extend(campo for campo in tipo.campos if campo not in COLUMNAS_PRODUCTO)
+    return tipo
+
+registrar_tipo(TipoProducto("disco", Discos, {"artista": "Artista", "genero": "Género"},
+                            indices=("artista", "genero"), pesos_texto={"artista": 2}))
+registrar_tipo(TipoProducto("libro", Libro, {"autor": "Autor", "genero": "Género"},
+                            indices=("autor", "genero"), pesos_texto={"autor": 2}))
+registrar_tipo(TipoProducto("revista", Revistas, {"tema": "Tema", "periodicidad": "Periodicidad"},
+                            articulo="la", femeninos=("periodicidad",), indices=("tema",),
+                            pesos_texto={"tema": 1}))
+
+def mensaje_tipos_validos():
+    return f"El tipo de producto debe ser {_enumerar((repr(nombre) for nombre in TIPOS_PRODUCTO), 'o')}."
+
+def producto_desde_dict(data):     #re-instancia la clase correcta según el campo "tipo"
+    tipo = TIPOS_PRODUCTO.get(data["tipo"])
+    if tipo is None:
+        raise ValueError(f"Tipo de producto desconocido: {data['tipo']}.")
+    return tipo.desde_dict(data)
+
+class AlmacenProductos(ABC):     #interfaz de persistencia usada por Inventario
+    ruta = None
+    metricas = None   # Métricas del inventario que lo usa (opcional)
+
+    def existe(self):
+        return True
+
+    @abstractmethod
+    def cargar(self):   #devuelve un iterable de diccionarios (formato de to_dict)
+        pass
+
+    @abstractmethod
+    def guardar_todo(self, productos):   #reescribe el almacenamiento completo
+        pass
+
+    def guardar_cambios(self, cambios, productos):   #cambios: lista de (operacion, producto)
+        # Por defecto se reescribe todo; los almacenes con escritura por registro lo redefinen
+        self.guardar_todo(productos)
+
+    def leer_marca_ids(self):   #mayor id que pudo haberse asignado (archivo auxiliar <ruta>.ids)
+        if self.ruta is None or not os.path.exists(self.ruta + ".ids"):
+            return 0
+        with open(self.ruta + ".ids", 'r') as file:
+            return int(file.read().strip() or 0)
+
+    def guardar_marca_ids(self, marca):
+        if self.ruta is None:
+            return
+        temporal = self.ruta + ".ids.tmp"
+        with open(temporal, 'w') as file:
+            file.write(str(marca))
+        os.replace(temporal, self.ruta + ".ids")
+
+    def _contar(self, nombre, cantidad):   #bytes leídos/escritos, solo si el inventario tiene métricas
+        if self.metricas is not None:
+            self.metricas.contar(nombre, cantidad)
+
+    def abrir_indexado(self):   #acceso por id sin cargar todo (ver IndiceArchivo); None si no lo admite
+        return None
+
+    def sincronizar(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+def iterar_arreglo_json(file, tamano_bloque=1 << 16, con_posiciones=False):   #parser incremental: un elemento del arreglo por vez
+    # con_posiciones=True devuelve (elemento, inicio, fin) en caracteres desde el comienzo del archivo
+    decodificador = json.JSONDecoder()
+    buffer = ""
+    posicion = 0
+    base = 0    # posición en el archivo del primer carácter de buffer
+    # Qué se espera a continuación: "[" al principio, luego un elemento o "]", después de cada
+    # elemento "," o "]", y después de una coma otro elemento (como json.load, sin comas de más)
+    esperado = "inicio"
+    while True:
+        # Saltear espacios, leyendo más bloques si hace falta
+        while posicion < len(buffer) and buffer[posicion] in " \t\r\n":
+            posicion += 1
+        if posicion == len(buffer):
+            base += len(buffer)
+            buffer, posicion = file.read(tamano_bloque), 0
+            if not buffer:
+                raise json.JSONDecodeError("Fin de archivo inesperado", "", 0)
+            continue
+        caracter = buffer[posicion]
+        if esperado == "inicio":
+            if caracter != "[":
+                raise json.JSONDecodeError("Se esperaba un arreglo JSON", buffer, posicion)
+            esperado = "primero"
+            posicion += 1
+            continue
+        if caracter == "]" and esperado != "elemento":
+            resto = buffer[posicion + 1:] + file.read()
+            if resto.strip(" \t\r\n"):
+                raise json.JSONDecodeError("Datos adicionales después del arreglo", buffer, posicion + 1)
+            return
+        if esperado == "despues":
+            if caracter != ",":
+                raise json.JSONDecodeError("Se esperaba ',' o ']'", buffer, posicion)
+            esperado = "elemento"
+            posicion += 1
+            continue
+        if caracter in ",]":
+            raise json.JSONDecodeError("Se esperaba un elemento", buffer, posicion)
+        esperado = "despues"
+        inicio = base + posicion
+        while True:
+            try:
+                item, fin = decodificador.raw_decode(buffer, posicion)
+                if fin < len(buffer):
+                    break
+                error = None  # El elemento llega justo al final del bloque: puede seguir en el próximo
+            except json.JSONDecodeError as e:
+                error = e
+            bloque = file.read(tamano_bloque)
+            if not bloque:
+                if error is not None:
+                    raise error
+                break
+            base += posicion
+            buffer, posicion = buffer[posicion:] + bloque, 0
+        yield (item, inicio, base + fin) if con_posiciones else item
+        posicion = fin
+
+def escribir_arreglo_json(file, productos, posiciones=None):   #mismo formato que json.dump(..., indent=4), un producto por vez
+    # Si se pasa una lista en posiciones, se agrega (id, inicio, largo) de cada producto escrito
+    file.write("[")
+    desplazamiento = 1
+    separador = "\n"
+    for producto in productos:
+        texto = "    " + json.dumps(producto.to_dict(), indent=4).replace("\n", "\n    ")
+        file.write(separador + texto)
+        if posiciones is not None:  # El texto es ASCII: caracteres = bytes
+            posiciones.append((producto.id, desplazamiento + len(separador) + 4, len(texto) - 4))
+        desplazamiento += len(separador) + len(texto)
+        separador = ",\n"
+    file.write("\n]" if separador != "\n" else "]")
+
+def escribir_lineas_json(file, productos, posiciones=None):   #JSON Lines: un producto compacto por línea
+    desplazamiento = 0
+    for producto in productos:
+        texto = json.dumps(producto.to_dict(), separators=(",", ":"))
+        file.write(texto + "\n")
+        if posiciones is not None:
+            posiciones.append((producto.id, desplazamiento, len(texto)))
+        desplazamiento += len(texto) + 1
+
+class IndiceArchivo:     #archivo JSON mapeado en memoria + índice binario id -> (posición, largo)
+    # El índice (<ruta>.idx) guarda el tamaño y la fecha del archivo de datos para detectar si quedó
+    # desactualizado, y los registros ordenados por id para buscarlos con búsqueda binaria.
+    FIRMA = b"INVIDX01"
+    CABECERA = struct.Struct("<8sQQQ")   # firma, tamaño y mtime_ns del archivo de datos, cantidad
+    REGISTRO = struct.Struct("<qQI")     # id, posición, largo
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.ruta_indice = ruta + ".idx"
+        self.cache = {}          # productos ya construidos, por id
+        self.metricas = None     # las del almacenamiento que lo abrió, si tiene
+        self._datos = None
+        self._indice = None
+        self._cantidad = 0
+
+    @classmethod
+    def escribir(cls, ruta, posiciones):   #posiciones: [(id, inicio, largo)]; devuelve False si hay ids no enteros
+        if not all(isinstance(id_producto, int) and not isinstance(id_producto, bool)
+                   for id_producto, _, _ in posiciones):
+            if os.path.exists(ruta + ".idx"):
+                os.remove(ruta + ".idx")
+            return False
+        posiciones.sort()
+        estado = os.stat(ruta)
+        temporal = ruta + ".idx.tmp"
+        with open(temporal, 'wb') as file:
+            file.write(cls.CABECERA.pack(cls.FIRMA, estado.st_size, estado.st_mtime_ns, len(posiciones)))
+            file.writelines(cls.REGISTRO.pack(*registro) for registro in posiciones)
+        os.replace(temporal, ruta + ".idx")
+        return True
+
+    @classmethod
+    def construir(cls, ruta):   #recorre el archivo una vez para generar el índice
+        posiciones = []
+        if ruta.endswith('.jsonl'):
+            with open(ruta, 'rb') as file:
+                desplazamiento = 0
+                for linea in file:
+                    if linea.strip():
+                        posiciones.append((json.loads(linea).get("id"), desplazamiento, len(linea.rstrip(b"\r\n"))))
+                    desplazamiento += len(linea)
+        else:
+            # latin-1 hace corresponder cada byte con un carácter: las posiciones del parser son bytes
+            with open(ruta, 'r', encoding='latin-1', newline='') as file:
+                for item, inicio, fin in iterar_arreglo_json(file, con_posiciones=True):
+                    posiciones.append((item.get("id"), inicio, fin - inicio))
+        return cls.escribir(ruta, posiciones)
+
+    def abrir(self):   #True si el índice está al día y quedó mapeado en memoria
+        if not os.path.exists(self.ruta_indice):
+            return False
+        estado = os.stat(self.ruta)
+        with open(self.ruta_indice, 'rb') as file:
+            firma, tamano, mtime, cantidad = self.CABECERA.unpack(file.read(self.CABECERA.size).ljust(self.CABECERA.size, b"\0"))
+            if firma != self.FIRMA or tamano != estado.st_size or mtime != estado.st_mtime_ns or not tamano:
+                return False
+            self._indice = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.ruta, 'rb') as file:
+            self._datos = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._cantidad = cantidad
+        return True
+
+    def __len__(self):
+        return self._cantidad
+
+    def _registro(self, posicion):
+        return self.REGISTRO.unpack_from(self._indice, self.CABECERA.size + posicion * self.REGISTRO.size)
+
+    def max_id(self):
+        return self._registro(self._cantidad - 1)[0] if self._cantidad else 0
+
+    def obtener(self, id_producto):   #construye (una sola vez) el producto con ese id, o None
+        producto = self.cache.get(id_producto)
+        if producto is not None or not isinstance(id_producto, int):
+            return producto
+        bajo, alto = 0, self._cantidad
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._registro(medio)[0] < id_producto:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo == self._cantidad:
+            return None
+        id_encontrado, inicio, largo = self._registro(bajo)
+        if id_encontrado != id_producto:
+            return None
+        producto = producto_desde_dict(json.loads(self._datos[inicio:inicio + largo]))
+        self.cache[id_producto] = producto
+        if self.metricas is not None:
+            self.metricas.contar("bytes_leidos", largo)
+        return producto
+
+    def cerrar(self):
+        for mapa in (self._datos, self._indice):
+            if mapa is not None:
+                mapa.close()
+        self._datos = self._indice = None
+
+class AlmacenJSON(AlmacenProductos):    #un único archivo JSON reescrito en cada cambio
+    # Admite el arreglo JSON de siempre (.json) o JSON Lines (.jsonl, un producto por línea);
+    # en ambos casos se lee y se escribe de a un producto, sin materializar el documento entero.
+    # Con indice_binario=True cada guardado deja además el índice <ruta>.idx para la apertura perezosa.
+    def __init__(self, ruta="productos.json", indice_binario=False):
+        self.ruta = ruta
+        self.indice_binario = indice_binario
+
+    def existe(self):
+        return os.path.exists(self.ruta)
 
-        # Validaciones específicas por tipo
-        if producto.tipo == "disco":
-            if not isinstance(producto, Discos):
-                raise TypeError("El producto debe ser una instancia de Discos.")
-            if not getattr(producto, "artista", None) or not getattr(producto, "genero", None):
-                raise ValueError("El disco debe tener un artista y un género.")
-        elif producto.tipo == "libro":
-            if not isinstance(producto, Libro):
-                raise TypeError("El producto debe ser una instancia de Libro.")
-            if not getattr(producto, "autor", None) or not getattr(producto, "genero", None):
-                raise ValueError("El libro debe tener un autor y un género.")
-        elif producto.tipo == "revista":
-            if not isinstance(producto, Revistas):
-                raise TypeError("El producto debe ser una instancia de Revistas.")
-            if not getattr(producto, "tema", None) or not getattr(producto, "periodicidad", None):
-                raise ValueError("La revista debe tener un tema y una periodicidad.")
+    def cargar(self):
+        with open(self.ruta, 'r') as file:
+            if self.ruta.endswith('.jsonl'):
+                for linea in file:
+                    if linea.strip():
+                        yield json.loads(linea)
+            else:
+                yield from iterar_arreglo_json(file)
+        self._contar("bytes_leidos", os.path.getsize(self.ruta))
+
+    def guardar_todo(self, productos):   #escritura atómica: archivo temporal + rename
+        if not os.path.exists(os.path.dirname(self.ruta)) and os.path.dirname(self.ruta):
+            os.makedirs(os.path.dirname(self.ruta))
+        if not self.ruta.endswith(('.json', '.jsonl')):
+            raise ValueError("La ruta del archivo debe terminar con '.json' o '.jsonl'.")
+        temporal = self.ruta + ".tmp"
+        posiciones = [] if self.indice_binario else None
+        with open(temporal, 'w', newline='') as file:
+            if self.ruta.endswith('.jsonl'):
+                escribir_lineas_json(file, productos, posiciones)
+            else:
+                escribir_arreglo_json(file, productos, posiciones)
+            file.flush()
+            os.fsync(file.fileno())
+            self._contar("bytes_escritos", file.tell())
+        os.replace(temporal, self.ruta)  # Un corte a mitad de escritura no deja el JSON corrupto
+        if posiciones is not None:
+            IndiceArchivo.escribir(self.ruta, posiciones)
+
+    def abrir_indexado(self):   #IndiceArchivo listo para leer productos sueltos, o None si no se puede
+        if not self.existe():
+            return None
+        indice = IndiceArchivo(self.ruta)
+        if not indice.abrir():
+            if not IndiceArchivo.construir(self.ruta) or not indice.abrir():
+                return None
+        indice.metricas = self.metricas
+        return indice
+
+class AlmacenJournal(AlmacenJSON):     #snapshot JSON + log de cambios de solo agregado
+    def __init__(self, ruta="productos.json", fsync_cada=32, compactar_cada=10000, indice_binario=False):
+        super().__init__(ruta, indice_binario)
+        self.ruta_log = ruta + ".log"
+        self.fsync_cada = fsync_cada          # registros entre cada fsync del log
+        self.compactar_cada = compactar_cada  # registros en el log antes de generar un nuevo snapshot
+        self._log = None
+        self._registros_en_log = 0
+        self._sin_sincronizar = 0
+
+    def existe(self):
+        return os.path.exists(self.ruta) or os.path.exists(self.ruta_log)
+
+    def abrir_indexado(self):   #solo si no hay cambios pendientes en el log
+        if os.path.exists(self.ruta_log):
+            return None
+        return super().abrir_indexado()
+
+    def cargar(self):   #snapshot más los cambios registrados en el log
+        self.sincronizar()
+        estado = {}
+        if os.path.exists(self.ruta):
+            for item in super().cargar():
+                estado[item.get("id")] = item
+        self._registros_en_log = 0
+        if not os.path.exists(self.ruta_log):
+            return list(estado.values())
+        with open(self.ruta_log, 'rb+') as file:
+            posicion = 0
+            for linea in file:
+                try:
+                    if not linea.endswith(b"\n"):
+                        raise json.JSONDecodeError("Registro sin terminar", "", 0)
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Última línea incompleta por un corte durante la escritura: se descarta
+                    # para no seguir agregando registros detrás de ella
+                    file.truncate(posicion)
+                    break
+                posicion += len(linea)
+                if registro["op"] == "eliminar":
+                    estado.pop(registro["id"], None)
+                else:
+                    estado[registro["id"]] = registro["datos"]  # Conserva la posición si ya existía
+                self._registros_en_log += 1
+        self._contar("bytes_leidos", posicion)
+        return list(estado.values())
+
+    def guardar_cambios(self, cambios, productos):
+        if self._log is None:
+            self._log = open(self.ruta_log, 'a')
+        escritos = 0
+        for operacion, producto in cambios:
+            registro = {"op": operacion, "id": producto.id}
+            if operacion != "eliminar":
+                registro["datos"] = producto.to_dict()
+            escritos += self._log.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        self._contar("bytes_escritos", escritos)  # json.dumps escapa lo no ASCII: caracteres = bytes
+        self._registros_en_log += len(cambios)
+        self._sin_sincronizar += len(cambios)
+        if self._registros_en_log >= self.compactar_cada:
+            self.guardar_todo(productos)
+        elif self._sin_sincronizar >= self.fsync_cada:
+            self.sincronizar()
+
+    def guardar_todo(self, productos):   #compactación: nuevo snapshot y log vacío
+        super().guardar_todo(productos)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.ruta_log):
+            os.remove(self.ruta_log)
+        self._registros_en_log = 0
+        self._sin_sincronizar = 0
+
+    def sincronizar(self):   #vuelca a disco los registros pendientes del log (fsync por lotes)
+        if self._log is not None and self._sin_sincronizar:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._sin_sincronizar = 0
+
+    def cerrar(self):
+        self.sincronizar()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+class AlmacenSQLite(AlmacenProductos):    #tabla única tipada, un registro por producto
+    # Las columnas salen de COLUMNAS_PRODUCTO; las de los campos de cada tipo se crean sin tipo
+    # declarado para guardar el valor tal como viene de to_dict (texto, número...)
+    TIPOS_COLUMNA = {"id": "INTEGER PRIMARY KEY", "tipo": "TEXT NOT NULL", "nombre": "TEXT NOT NULL",
+                     "precio": "REAL NOT NULL", "stock": "INTEGER NOT NULL"}
+
+    def __init__(self, ruta="productos.db"):
+        self.ruta = ruta
+        self.columnas = ()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        with self._conexion:
+            definiciones = ", ".join(f"{columna} {self.TIPOS_COLUMNA.get(columna, '')}".rstrip()
+                                     for columna in COLUMNAS_PRODUCTO)
+            self._conexion.execute(f"CREATE TABLE IF NOT EXISTS productos ({definiciones})")
+            self._conexion.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_tipo_nombre ON productos (tipo, nombre)")
+            self._conexion.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER)")
+        self._actualizar_columnas()
+
+    def _actualizar_columnas(self):   #agrega a la tabla los campos de tipos registrados después de crearla
+        if len(self.columnas) == len(COLUMNAS_PRODUCTO):
+            return
+        existentes = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(productos)")}
+        with self._conexion:
+            for columna in COLUMNAS_PRODUCTO:
+                if columna not in existentes:
+                    self._conexion.execute(f"ALTER TABLE productos ADD COLUMN {columna}")
+        self.columnas = tuple(COLUMNAS_PRODUCTO)
+        columnas = ", ".join(self.columnas)
+        actualizaciones = ", ".join(f"{c} = excluded.{c}" for c in self.columnas[1:])
+        self._sql_upsert = (f"INSERT INTO productos ({columnas}) VALUES ({', '.join('?' * len(self.columnas))}) "
+                            f"ON CONFLICT(id) DO UPDATE SET {actualizaciones}")
+
+    def _fila(self, producto):
+        datos = producto.to_dict()
+        return tuple(datos.get(columna) for columna in self.columnas)
+
+    def cargar(self):
+        self._actualizar_columnas()
+        columnas = self.columnas
+        cursor = self._conexion.execute(f"SELECT {', '.join(columnas)} FROM productos ORDER BY id")
+        for fila in cursor:
+            datos = dict(zip(columnas, fila))
+            campos = ("tipo", "nombre", "precio", "stock", "id") + CAMPOS_POR_TIPO.get(datos["tipo"], ())
+            yield {campo: datos[campo] for campo in campos}
+
+    def guardar_cambios(self, cambios, productos):   #una transacción por grupo de cambios
+        self._actualizar_columnas()
+        with self._conexion:
+            for operacion, producto in cambios:
+                if operacion == "eliminar":
+                    self._conexion.execute("DELETE FROM productos WHERE id = ?", (producto.id,))
+                else:
+                    self._conexion.execute(self._sql_upsert, self._fila(producto))
+
+    def leer_marca_ids(self):
+        fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = 'marca_ids'").fetchone()
+        return fila[0] if fila else 0
+
+    def guardar_marca_ids(self, marca):
+        with self._conexion:
+            self._conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('marca_ids', ?)", (marca,))
+
+    def guardar_todo(self, productos):
+        self._actualizar_columnas()
+        with self._conexion:
+            self._conexion.execute("DELETE FROM productos")
+            self._conexion.executemany(self._sql_upsert, (self._fila(p) for p in productos))
+
+    def cerrar(self):
+        self._conexion.close()
+
+def migrar_json_a_sqlite(origen="productos.json", destino="productos.db"):   #convierte productos.json en una base SQLite
+    # Con un log de cambios pendiente se lee snapshot + log; la marca de ids pasa a la base
+    # para que los ids de productos eliminados no se vuelvan a asignar
+    if os.path.exists(origen + ".log"):
+        almacen_origen = AlmacenJournal(origen)
+    else:
+        almacen_origen = AlmacenJSON(origen)
+    inventario = Inventario(almacen=almacen_origen)
+    almacen = AlmacenSQLite(destino)
+    almacen.guardar_todo(inventario.productos)
+    almacen.guardar_marca_ids(max(almacen_origen.leer_marca_ids(), inventario._ids._siguiente - 1))
+    almacen.cerrar()
+    almacen_origen.cerrar()
+    print(f"{len(inventario.productos)} productos migrados de {origen} a {destino}.")
+
+class SumideroMemoria:     #acumula contadores y tiempos en memoria; resumen() los devuelve
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.contadores = {}   # (nombre, operacion) -> total
+        self.tiempos = {}      # operacion -> [llamadas, segundos totales, máximo]
+
+    def contar(self, nombre, cantidad, operacion):
+        clave = (nombre, operacion)
+        with self._candado:
+            self.contadores[clave] = self.contadores.get(clave, 0) + cantidad
+
+    def registrar_tiempo(self, operacion, segundos):
+        with self._candado:
+            tiempo = self.tiempos.get(operacion)
+            if tiempo is None:
+                self.tiempos[operacion] = [1, segundos, segundos]
+            else:
+                tiempo[0] += 1
+                tiempo[1] += segundos
+                if segundos > tiempo[2]:
+                    tiempo[2] = segundos
+
+    def resumen(self):   #{"contadores": {...}, "tiempos": {operacion: {llamadas, total_s, promedio_ms, maximo_ms}}}
+        with self._candado:
+            contadores = {nombre if operacion is None else f"{nombre}.{operacion}": total
+                          for (nombre, operacion), total in self.contadores.items()}
+            tiempos = {operacion: {"llamadas": llamadas, "total_s": total,
+                                   "promedio_ms": 1000 * total / llamadas, "maximo_ms": 1000 * maximo}
+                       for operacion, (llamadas, total, maximo) in self.tiempos.items()}
+        return {"contadores": contadores, "tiempos": tiempos}
+
+    def reiniciar(self):
+        with self._candado:
+            self.contadores.clear()
+            self.tiempos.clear()
+
+    def volcar(self):
+        pass
+
+class SumideroLog:     #una línea de log por evento (logger "inventario.metricas", nivel DEBUG por defecto)
+    def __init__(self, logger=None, nivel=logging.DEBUG):
+        self.logger = logger or logging.getLogger("inventario.metricas")
+        self.nivel = nivel
+
+    def contar(self, nombre, cantidad, operacion):
+        if self.logger.isEnabledFor(self.nivel):
+            self.logger.log(self.nivel, "%s%s +%s", nombre, "" if operacion is None else f"[{operacion}]", cantidad)
+
+    def registrar_tiempo(self, operacion, segundos):
+        if self.logger.isEnabledFor(self.nivel):
+            self.logger.log(self.nivel, "%s %.3f ms", operacion, 1000 * segundos)
+
+    def volcar(self):
+        pass
+
+class SumideroPrometheus(SumideroMemoria):     #archivo en formato de texto de Prometheus (textfile collector)
+    # Se reescribe de forma atómica al cerrar el inventario, al llamar a volcar() o, si se pide,
+    # cada `intervalo` segundos como máximo (comprobado al registrar un tiempo, sin hilos aparte).
+    def __init__(self, ruta, prefijo="inventario", intervalo=None):
+        super().__init__()
+        self.ruta = ruta
+        self.prefijo = prefijo
+        self.intervalo = intervalo
+        self._ultimo_volcado = time.monotonic()
+
+    def registrar_tiempo(self, operacion, segundos):
+        super().registrar_tiempo(operacion, segundos)
+        if self.intervalo is not None and time.monotonic() - self._ultimo_volcado >= self.intervalo:
+            self.volcar()
+
+    def _lineas(self):
+        prefijo = self.prefijo
+        with self._candado:
+            contadores = sorted(self.contadores.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            tiempos = sorted(self.tiempos.items())
+        tipo_anterior = None
+        for (nombre, operacion), total in contadores:
+            metrica = f"{prefijo}_{re.sub(r'[^a-zA-Z0-9_]', '_', nombre)}_total"
+            if metrica != tipo_anterior:
+                yield f"# TYPE {metrica} counter"
+                tipo_anterior = metrica
+            etiqueta = "" if operacion is None else f'{{operacion="{operacion}"}}'
+            yield f"{metrica}{etiqueta} {total}"
+        if tiempos:
+            yield f"# TYPE {prefijo}_duracion_segundos summary"
+            for operacion, (llamadas, total, _) in tiempos:
+                yield f'{prefijo}_duracion_segundos_count{{operacion="{operacion}"}} {llamadas}'
+                yield f'{prefijo}_duracion_segundos_sum{{operacion="{operacion}"}} {total:.9f}'
+            yield f"# TYPE {prefijo}_duracion_maxima_segundos gauge"
+            for operacion, (_, _, maximo) in tiempos:
+                yield f'{prefijo}_duracion_maxima_segundos{{operacion="{operacion}"}} {maximo:.9f}'
+
+    def volcar(self):
+        temporal = self.ruta + ".tmp"
+        with open(temporal, 'w') as file:
+            file.write("\n".join(self._lineas()) + "\n")
+        os.replace(temporal, self.ruta)  # El recolector nunca ve un archivo a medio escribir
+        self._ultimo_volcado = time.monotonic()
+
+class Metricas:     #instrumentación opcional de Inventario: reparte cada evento entre los sumideros
+    # Tiempos por operación (métodos públicos y fases internas como "validar" y "persistir") y
+    # contadores: errores, bytes leídos/escritos, productos recorridos y cambios persistidos.
+    def __init__(self, *sumideros):
+        self.sumideros = sumideros or (SumideroMemoria(),)
+
+    def contar(self, nombre, cantidad=1, operacion=None):
+        for sumidero in self.sumideros:
+            sumidero.contar(nombre, cantidad, operacion)
+
+    def registrar_tiempo(self, operacion, segundos):
+        for sumidero in self.sumideros:
+            sumidero.registrar_tiempo(operacion, segundos)
+
+    @contextmanager
+    def medir(self, operacion):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_tiempo(operacion, time.perf_counter() - inicio)
+
+    def resumen(self):   #resumen del primer sumidero en memoria, o None si no hay ninguno
+        for sumidero in self.sumideros:
+            if isinstance(sumidero, SumideroMemoria):
+                return sumidero.resumen()
+        return None
+
+    def volcar(self):
+        for sumidero in self.sumideros:
+            sumidero.volcar()
+
+class CerrojoLectorEscritor:    #varios lectores en paralelo o un único escritor
+    # El escritor es reentrante y puede leer mientras escribe; un lector que ya tiene la
+    # lectura puede volver a tomarla aunque haya escritores esperando (si no, se bloquearía).
+    def __init__(self):
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._escritor = None           # hilo que tiene la escritura
+        self._profundidad = 0           # reentradas del escritor
+        self._escritores_esperando = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def lectura(self):
+        hilo = threading.get_ident()
+        if self._escritor == hilo:
+            yield
+            return
+        propias = getattr(self._local, "lecturas", 0)
+        with self._condicion:
+            while self._escritor is not None or (self._escritores_esperando and not propias):
+                self._condicion.wait()
+            self._lectores += 1
+        self._local.lecturas = propias + 1
+        try:
+            yield
+        finally:
+            self._local.lecturas = propias
+            with self._condicion:
+                self._lectores -= 1
+                if not self._lectores:
+                    self._condicion.notify_all()
+
+    @contextmanager
+    def escritura(self):
+        hilo = threading.get_ident()
+        with self._condicion:
+            if self._escritor == hilo:
+                self._profundidad += 1
+            else:
+                if getattr(self._local, "lecturas", 0):
+                    raise RuntimeError("No se puede pasar de lectura a escritura dentro del mismo hilo.")
+                self._escritores_esperando += 1
+                try:
+                    while self._escritor is not None or self._lectores:
+                        self._condicion.wait()
+                finally:
+                    self._escritores_esperando -= 1
+                self._escritor = hilo
+                self._profundidad = 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._profundidad -= 1
+                if not self._profundidad:
+                    self._escritor = None
+                    self._condicion.notify_all()
+
+def _iteracion_medida(metricas, operacion, duracion, iterador):   #suma el tiempo de cada paso de un generador
+    # El tiempo del consumidor entre elementos no cuenta; se registra al agotarse o cerrarse
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            except Exception:
+                metricas.contar("errores", 1, operacion)
+                raise
+            finally:
+                duracion += time.perf_counter() - inicio
+            yield elemento
+    finally:
+        metricas.registrar_tiempo(operacion, duracion)
+
+def _medido(metodo):     #versión del método que registra su tiempo y sus errores en self._metricas
+    # Si el método devuelve un generador (consultar) se mide también su recorrido
+    operacion = metodo.__name__
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        metricas = self._metricas
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(self, *args, **kwargs)
+        except Exception:
+            metricas.contar("errores", 1, operacion)
+            metricas.registrar_tiempo(operacion, time.perf_counter() - inicio)
+            raise
+        duracion = time.perf_counter() - inicio
+        if isinstance(resultado, types.GeneratorType):
+            return _iteracion_medida(metricas, operacion, duracion, resultado)
+        metricas.registrar_tiempo(operacion, duracion)
+        return resultado
+    return envoltura
+
+def _lectura(metodo, materializar=True):     #sin cerrojo (modo no concurrente) se llama directo al método
+    # En modo perezoso, salvo los métodos que saben leer del archivo, primero se carga todo.
+    # Sin métricas se llama al método original: el costo es una sola comparación.
+    medido = _medido(metodo)
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if materializar and self._diferido is not None:
+            self._materializar()
+        llamar = metodo if self._metricas is None else medido
+        if self._cerrojo is None:
+            return llamar(self, *args, **kwargs)
+        with self._cerrojo.lectura():
+            return llamar(self, *args, **kwargs)
+    return envoltura
+
+def _escritura(metodo):
+    medido = _medido(metodo)
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if self._diferido is not None:
+            self._materializar()
+        llamar = metodo if self._metricas is None else medido
+        if self._cerrojo is None:
+            return llamar(self, *args, **kwargs)
+        with self._cerrojo.escritura():
+            return llamar(self, *args, **kwargs)
+    return envoltura
+
+class AsignadorIds:     #ids monótonos y únicos, O(1) por asignación
+    # La marca máxima se persiste por bloques: tras un reinicio se continúa desde ella,
+    # así un id eliminado nunca se reutiliza (los ids reservados y no usados se pierden).
+    def __init__(self, almacen, bloque=100):
+        self._almacen = almacen
+        self._bloque = bloque
+        self._lock = threading.Lock()
+        self._limite = almacen.leer_marca_ids()   # mayor id ya reservado en el almacenamiento
+        self._siguiente = self._limite + 1
+
+    def observar(self, id_producto):   #un id asignado desde afuera (carga, alta con id explícito)
+        if isinstance(id_producto, int) and id_producto >= self._siguiente:
+            with self._lock:
+                self._siguiente = max(self._siguiente, id_producto + 1)
+
+    def reservar(self, cantidad=1):   #devuelve un range con `cantidad` ids nuevos
+        with self._lock:
+            inicio = self._siguiente
+            self._siguiente += cantidad
+            if self._siguiente - 1 > self._limite:
+                self._limite = self._siguiente - 1 + self._bloque
+                self._almacen.guardar_marca_ids(self._limite)
+            return range(inicio, self._siguiente)
+
+    def asignar(self):
+        return self.reservar(1)[0]
+
+def normalizar_texto(texto):   #minúsculas y sin tildes: "Canción" -> "cancion"
+    texto = unicodedata.normalize("NFKD", str(texto).casefold())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def tokenizar(texto):
+    return re.findall(r"\w+", normalizar_texto(texto))
+
+class IndiceTexto:     #índice invertido token -> {id: peso}, actualizado producto a producto
+    def __init__(self):
+        self._postings = {}         # token -> {id: peso}
+        self._por_producto = {}     # id -> {token: peso}, para poder quitar un producto
+        self._vocabulario = []      # tokens ordenados, para las búsquedas por prefijo
+        self._nuevos = set()        # tokens aún no incorporados a _vocabulario
+        self._quitados = False
+        self._candado = threading.Lock()   # la mezcla del vocabulario ocurre durante lecturas en paralelo
+
+    def agregar(self, producto):
+        pesos = {}
+        for campo, peso in PESOS_TEXTO[producto.tipo].items():
+            valor = getattr(producto, campo, None)
+            if valor:
+                for token in tokenizar(valor):
+                    pesos[token] = pesos.get(token, 0) + peso
+        self._por_producto[producto.id] = pesos
+        for token, peso in pesos.items():
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = {}
+                self._nuevos.add(token)
+            ids[producto.id] = peso
+
+    def quitar(self, producto):
+        for token in self._por_producto.pop(producto.id, ()):
+            ids = self._postings[token]
+            del ids[producto.id]
+            if not ids:
+                del self._postings[token]
+                self._nuevos.discard(token)
+                self._quitados = True
+
+    def _tokens_con_prefijo(self, prefijo):
+        if self._nuevos or self._quitados:  # Se mezclan los cambios del vocabulario en una pasada
+            with self._candado:
+                if self._nuevos or self._quitados:
+                    nuevos = self._nuevos
+                    # Un token quitado y vuelto a agregar antes de mezclar sigue en _vocabulario y
+                    # además está en _nuevos: se conserva una sola copia, la de _nuevos
+                    vigentes = ((t for t in self._vocabulario if t in self._postings and t not in nuevos)
+                                if self._quitados else self._vocabulario)
+                    self._vocabulario = list(heapq.merge(vigentes, sorted(nuevos)))
+                    self._nuevos = set()
+                    self._quitados = False
+        vocabulario = self._vocabulario  # La mezcla reemplaza la lista, no la modifica
+        inicio = bisect.bisect_left(vocabulario, prefijo)
+        for token in itertools.islice(vocabulario, inicio, None):
+            if not token.startswith(prefijo):
+                break
+            yield token
+
+    def buscar(self, consulta, limite=10):   #[(id, puntaje)] con todas las palabras (la última, o cualquiera, como prefijo)
+        total = max(len(self._por_producto), 1)
+        puntajes = None
+        for palabra in tokenizar(consulta):
+            coincidencias = {}
+            for token in self._tokens_con_prefijo(palabra):
+                ids = self._postings[token]
+                # Palabra completa vale más que prefijo; las palabras raras valen más que las comunes
+                factor = (1.0 if token == palabra else 0.5) * math.log(1 + total / len(ids))
+                for id_producto, peso in ids.items():
+                    puntaje = peso * factor
+                    if puntaje > coincidencias.get(id_producto, 0):
+                        coincidencias[id_producto] = puntaje
+            if puntajes is not None:
+                coincidencias = {i: p + puntajes[i] for i, p in coincidencias.items() if i in puntajes}
+            puntajes = coincidencias
+            if not puntajes:
+                return []
+        if puntajes is None:
+            return []
+        return heapq.nlargest(limite, puntajes.items(), key=lambda item: item[1])
+
+    def autocompletar(self, prefijo, limite=10):   #palabras que empiezan con el prefijo, las más frecuentes primero
+        palabra = normalizar_texto(prefijo).strip()
+        return heapq.nlargest(limite, self._tokens_con_prefijo(palabra), key=lambda t: len(self._postings[t]))
+
+class Agregados:     #totales del inventario mantenidos en cada alta, modificación y baja
+    def __init__(self, umbral_stock_bajo=5):
+        self.umbral_stock_bajo = umbral_stock_bajo
+        self.valor_total = 0.0                  # suma de precio * stock
+        self.productos_por_tipo = {}
+        self.unidades_por_tipo = {}
+        self.productos_por_genero = {}
+        self.unidades_por_genero = {}
+        self._stock = {}                        # id -> stock vigente
+        self._stock_bajo = {}                   # id -> stock, solo los que están en o bajo el umbral
+        self._monticulo = []                    # (stock, id); las entradas viejas se descartan al consultar
+        self._candado = threading.Lock()        # menor_stock modifica el montículo durante lecturas en paralelo
+
+    @staticmethod
+    def _sumar(contador, clave, cantidad):
+        total = contador.get(clave, 0) + cantidad
+        if total:
+            contador[clave] = total
+        else:
+            contador.pop(clave, None)  # Puede no existir: primer producto de la clave con stock 0
+
+    def agregar(self, producto):
+        self.valor_total += producto.precio * producto.stock
+        self._sumar(self.productos_por_tipo, producto.tipo, 1)
+        self._sumar(self.unidades_por_tipo, producto.tipo, producto.stock)
+        genero = getattr(producto, "genero", None)
+        if genero is not None:
+            self._sumar(self.productos_por_genero, genero, 1)
+            self._sumar(self.unidades_por_genero, genero, producto.stock)
+        self._stock[producto.id] = producto.stock
+        if producto.stock <= self.umbral_stock_bajo:
+            self._stock_bajo[producto.id] = producto.stock
+        heapq.heappush(self._monticulo, (producto.stock, producto.id))
+        if len(self._monticulo) > 2 * len(self._stock) + 64:
+            self._monticulo = [(stock, id_producto) for id_producto, stock in self._stock.items()]
+            heapq.heapify(self._monticulo)
+
+    def quitar(self, producto):
+        self.valor_total -= producto.precio * producto.stock
+        self._sumar(self.productos_por_tipo, producto.tipo, -1)
+        self._sumar(self.unidades_por_tipo, producto.tipo, -producto.stock)
+        genero = getattr(producto, "genero", None)
+        if genero is not None:
+            self._sumar(self.productos_por_genero, genero, -1)
+            self._sumar(self.unidades_por_genero, genero, -producto.stock)
+        del self._stock[producto.id]
+        self._stock_bajo.pop(producto.id, None)
+
+    def cantidad_stock_bajo(self):
+        return len(self._stock_bajo)
+
+    def stock_bajo(self):   #[(id, stock)] en o bajo el umbral, de menor a mayor stock
+        return sorted(self._stock_bajo.items(), key=lambda item: (item[1], item[0]))
+
+    def menor_stock(self, cantidad=10):   #[(id, stock)] con menos stock, O(cantidad * log n)
+        encontrados = []
+        vistos = set()
+        with self._candado:
+            while self._monticulo and len(encontrados) < cantidad:
+                stock, id_producto = heapq.heappop(self._monticulo)
+                if self._stock.get(id_producto) == stock and id_producto not in vistos:
+                    encontrados.append((id_producto, stock))
+                    vistos.add(id_producto)
+            for id_producto, stock in encontrados:  # Las entradas vigentes vuelven al montículo
+                heapq.heappush(self._monticulo, (stock, id_producto))
+        return encontrados
+
+def _categorizar(valores):   #códigos enteros por valor (-1 para None) y la lista de categorías
+    codigos = {}
+    columna = np.fromiter((-1 if v is None else codigos.setdefault(v, len(codigos)) for v in valores),
+                          dtype=np.int32, count=len(valores))
+    return list(codigos), columna
+
+class VistaColumnar:     #instantánea del catálogo en arreglos NumPy para análisis y cambios masivos
+    # Los cambios se hacen sobre vista.precio / vista.stock con operaciones vectorizadas y se
+    # confirman todos juntos con Inventario.aplicar_columnas(vista).
+    def __init__(self, productos):
+        if np is None:
+            raise ImportError("La vista columnar requiere NumPy (pip install numpy).")
+        productos = list(productos)
+        n = len(productos)
+        self.id = np.fromiter((p.id for p in productos), dtype=np.int64, count=n)
+        self.precio = np.fromiter((p.precio for p in productos), dtype=np.float64, count=n)
+        self.stock = np.fromiter((p.stock for p in productos), dtype=np.int64, count=n)
+        self.categorias_tipo, self.tipo = _categorizar([p.tipo for p in productos])
+        self.categorias_genero, self.genero = _categorizar([getattr(p, "genero", None) for p in productos])
+        self._precio_original = self.precio.copy()
+        self._stock_original = self.stock.copy()
+
+    def __len__(self):
+        return len(self.id)
+
+    def mascara(self, tipo=None, genero=None):   #filas que cumplen los filtros (arreglo booleano)
+        resultado = np.ones(len(self.id), dtype=bool)
+        for valor, categorias, codigos in ((tipo, self.categorias_tipo, self.tipo),
+                                          (genero, self.categorias_genero, self.genero)):
+            if valor is not None:
+                codigo = categorias.index(valor) if valor in categorias else -2
+                resultado &= codigos == codigo
+        return resultado
+
+    def cambios(self):   #índices de las filas modificadas desde la instantánea o la última confirmación
+        return np.nonzero((self.precio != self._precio_original) | (self.stock != self._stock_original))[0]
+
+    def valor_total(self, mascara=None):
+        if mascara is None:
+            return float(self.precio @ self.stock)
+        return float(self.precio[mascara] @ self.stock[mascara])
+
+    def estadisticas_precio(self, mascara=None):
+        precios = self.precio if mascara is None else self.precio[mascara]
+        if not len(precios):
+            return {"cantidad": 0}
+        return {"cantidad": int(len(precios)), "minimo": float(precios.min()), "maximo": float(precios.max()),
+                "promedio": float(precios.mean()), "mediana": float(np.median(precios))}
+
+FORMATOS_LISTADO = ("texto", "csv", "jsonl")
+
+def formatear_productos(productos, formato="texto"):   #genera el texto de cada producto en el formato pedido
+    if formato == "texto":
+        for producto in productos:
+            datos = producto.to_dict()
+            yield (f"ID: {producto.id}, Tipo: {producto.tipo}, Nombre: {producto.nombre}, "
+                   f"Precio: {producto.precio}, Stock: {producto.stock}\n"
+                   + DETALLE_TEXTO.get(producto.tipo, "").format_map(datos))
+    elif formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, COLUMNAS_PRODUCTO, lineterminator="\n")
+        escritor.writeheader()
+        for producto in productos:
+            escritor.writerow(producto.to_dict())
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    elif formato == "jsonl":
+        for producto in productos:
+            yield json.dumps(producto.to_dict(), ensure_ascii=False) + "\n"
+    else:
+        raise ValueError(f"Formato desconocido: {formato}. Use uno de {', '.join(FORMATOS_LISTADO)}.")
+
+def escribir_en_lotes(lineas, salida, tamano_lote=500):   #una escritura por lote en lugar de una por línea
+    while True:
+        lote = "".join(itertools.islice(lineas, tamano_lote))
+        if not lote:
+            break
+        salida.write(lote)
+        salida.flush()  # El listado empieza a verse antes de terminar de formatearse
+
+class Inventario:       #METODOS DE CRUD
+    def __init__(self, file_path="productos.json", indices_secundarios=True, almacen=None,
+                 journal=False, fsync_cada=32, compactar_cada=10000, concurrente=False, indice_texto=True,
+                 umbral_stock_bajo=5, perezoso=False, metricas=None):
+        # Instrumentación opcional (ver Metricas); con None no se mide nada
+        self._metricas = metricas
+        # Modo concurrente: lecturas en paralelo, cambios (y escrituras a disco) de a uno
+        self._cerrojo = CerrojoLectorEscritor() if concurrente else None
+        # Modo perezoso: el archivo se mapea en memoria y los productos se construyen al pedirlos
+        self.perezoso = perezoso
+        self._diferido = None
+        self._pendientes = None  # cambios retenidos por guardado_diferido()
+        # Índices en memoria, se mantienen sincronizados en cada alta, modificación y baja
+        self._por_id = {}        # id -> producto (conserva el orden de inserción)
+        self._por_clave = {}     # (tipo, nombre) -> id
+        self._por_tipo = {}      # tipo -> ids del tipo (dict usado como conjunto ordenado)
+        self._texto = IndiceTexto() if indice_texto else None   # búsqueda por nombre, artista, autor y tema
+        self._agregados = Agregados(umbral_stock_bajo)            # valor total, conteos y stock bajo
+        self._secundarios = {tipo: {campo: {} for campo in campos}
+                             for tipo, campos in INDICES_SECUNDARIOS.items()} if indices_secundarios else None
+        # Persistencia: JSON completo por defecto, journal (log de cambios) o cualquier AlmacenProductos
+        if almacen is None:
+            if journal:
+                almacen = AlmacenJournal(file_path, fsync_cada, compactar_cada, indice_binario=perezoso)
+            else:
+                almacen = AlmacenJSON(file_path, indice_binario=perezoso)
+        self.almacen = almacen
+        if metricas is not None:
+            almacen.metricas = metricas
+        self.file_path = almacen.ruta
+        self._ids = AsignadorIds(almacen)
+        self.cargar_productos_json()
+
+    @property
+    @_lectura
+    def productos(self):
+        return list(self._por_id.values())
+
+    @property
+    def metricas(self):
+        return self._metricas
+
+    def _medir(self, fase):   #mide una fase interna (validar, persistir...); sin métricas no hace nada
+        return nullcontext() if self._metricas is None else self._metricas.medir(fase)
+
+    def _recorridos(self, operacion, cantidad):   #productos examinados por una operación
+        if self._metricas is not None:
+            self._metricas.contar("productos_recorridos", cantidad, operacion)
+
+    def _indexar(self, producto):
+        self._por_id[producto.id] = producto
+        self._ids.observar(producto.id)
+        self._indexar_campos(producto)
+
+    def _desindexar(self, producto):
+        del self._por_id[producto.id]
+        self._desindexar_campos(producto)
+
+    def _indexar_campos(self, producto):   #índices que dependen de atributos modificables
+        self._por_clave[(producto.tipo, producto.nombre)] = producto.id
+        self._por_tipo.setdefault(producto.tipo, {})[producto.id] = None
+        self._agregados.agregar(producto)
+        if self._texto is not None:
+            self._texto.agregar(producto)
+        if self._secundarios is not None and producto.tipo in self._secundarios:
+            for campo, indice in self._secundarios[producto.tipo].items():
+                indice.setdefault(getattr(producto, campo, None), set()).add(producto.id)
+
+    def _desindexar_campos(self, producto):
+        del self._por_clave[(producto.tipo, producto.nombre)]
+        del self._por_tipo[producto.tipo][producto.id]
+        self._agregados.quitar(producto)
+        if self._texto is not None:
+            self._texto.quitar(producto)
+        if self._secundarios is not None and producto.tipo in self._secundarios:
+            for campo, indice in self._secundarios[producto.tipo].items():
+                valor = getattr(producto, campo, None)
+                ids = indice.get(valor)
+                if ids is not None:
+                    ids.discard(producto.id)
+                    if not ids:
+                        del indice[valor]
+
+    @_escritura
+    def crear(self, producto):    #1 Agregar un nuevo producto
+        with self._medir("validar"):
+            self._validar_producto(producto)
+        if producto.id is None:
+            producto.id = self._ids.asignar()  # Id generado automáticamente
 
         # Validaciones de unicidad
-        for p in self.productos:
-            if p.id == producto.id:
-                raise ValueError(f"Ya existe un producto con el ID {producto.id}.")
-            if p.tipo == producto.tipo and p.nombre == producto.nombre:
-                raise ValueError(f"Ya existe un producto del tipo {producto.tipo} con el nombre {producto.nombre}.")
+        if producto.id in self._por_id:
+            raise ValueError(f"Ya existe un producto con el ID {producto.id}.")
+        if (producto.tipo, producto.nombre) in self._por_clave:
+            raise ValueError(f"Ya existe un producto del tipo {producto.tipo} con el nombre {producto.nombre}.")
 
-        self.productos.append(producto)
+        self._indexar(producto)
         print(f"Producto {producto.nombre} agregado correctamente.")
-        self.guardar_productos_json()  # Guardar automáticamente después de agregar
+        self._persistir([("crear", producto)])  # Guardar automáticamente después de agregar
         return producto
 
-    def listar(self):           #2 Listar los productos
-        if not self.productos:
-            print("No hay productos en el inventario.")
+    def _validar_producto(self, producto):   #validaciones que no dependen del resto del inventario
+        tipo = TIPOS_PRODUCTO.get(producto.tipo) if isinstance(producto, Productos) else None
+        if tipo is None:
+            if not isinstance(producto, tuple(TIPOS_POR_CLASE)):
+                nombres = _enumerar((clase.__name__ for clase in TIPOS_POR_CLASE), "o")
+                raise TypeError(f"El producto debe ser una instancia de {nombres}.")
+            raise ValueError(mensaje_tipos_validos())
+        tipo.validar(producto)  # Clase, nombre, precio, stock y campos propios del tipo
+
+    @_escritura
+    def cargar_lote(self, registros, guardar=True):   #Carga masiva de productos (instancias o diccionarios)
+        # Se valida todo el lote en una sola pasada: la unicidad se comprueba contra
+        # los índices y los conjuntos del propio lote, los registros inválidos se
+        # informan sin abortar la carga y se guarda una única vez al final.
+        ids = set()
+        claves = set()
+        agregados = []
+        rechazados = []
+        leidos = 0
+        with self._medir("validar"):
+            for indice, item in enumerate(registros):
+                leidos += 1
+                try:
+                    producto = item if isinstance(item, Productos) else producto_desde_dict(item)
+                    self._validar_producto(producto)
+                    clave = (producto.tipo, producto.nombre)
+                    if producto.id is not None and (producto.id in ids or producto.id in self._por_id):
+                        raise ValueError(f"Ya existe un producto con el ID {producto.id}.")
+                    if clave in claves or clave in self._por_clave:
+                        raise ValueError(f"Ya existe un producto del tipo {producto.tipo} con el nombre {producto.nombre}.")
+                except KeyError as e:
+                    rechazados.append((indice, f"Falta el campo {e}."))
+                    continue
+                except (TypeError, ValueError) as e:
+                    rechazados.append((indice, str(e)))
+                    continue
+                if producto.id is not None:
+                    self._ids.observar(producto.id)  # Antes de reservar: los ids asignados no pueden chocar con este
+                ids.add(producto.id)
+                claves.add(clave)
+                agregados.append(producto)
+        self._recorridos("cargar_lote", leidos)
+
+        # Los productos sin id toman ids de un único bloque reservado
+        sin_id = [producto for producto in agregados if producto.id is None]
+        for producto, id_producto in zip(sin_id, self._ids.reservar(len(sin_id)) if sin_id else ()):
+            producto.id = id_producto
+
+        for producto in agregados:
+            self._indexar(producto)
+        if agregados and guardar:
+            self._persistir([("crear", producto) for producto in agregados])  # Una sola escritura para todo el lote
+        return {"agregados": len(agregados), "rechazados": rechazados}
+
+    def nuevo_id(self):   #id libre para un producto nuevo
+        return self._ids.asignar()
+
+    def reservar_ids(self, cantidad):   #bloque de ids consecutivos para importaciones
+        return self._ids.reservar(cantidad)
+
+    @_lectura
+    def listar(self, pagina=None, por_pagina=20, formato="texto", salida=None):   #2 Listar los productos
+        salida = sys.stdout if salida is None else salida
+        if formato not in FORMATOS_LISTADO:
+            raise ValueError(f"Formato desconocido: {formato}. Use uno de {', '.join(FORMATOS_LISTADO)}.")
+        if not self._por_id:
+            if formato == "texto":
+                print("No hay productos en el inventario.", file=salida)
             return []
-        print("Lista de productos:")
-        for producto in self.productos:
-            print(f"ID: {producto.id}, Tipo: {producto.tipo}, Nombre: {producto.nombre}, Precio: {producto.precio}, Stock: {producto.stock}")
-            if isinstance(producto, Discos):
-                print(f"  Artista: {producto.artista}, Género: {producto.genero}")
-            elif isinstance(producto, Libro):
-                print(f"  Autor: {producto.autor}, Género: {producto.genero}")
-            elif isinstance(producto, Revistas):
-                print(f"  Tema: {producto.tema}, Periodicidad: {producto.periodicidad}")
-        print("Productos listados correctamente.")
-        return self.productos
+        if pagina is None:
+            mostrados = list(self._por_id.values())
+        else:
+            inicio = pagina * por_pagina
+            mostrados = list(itertools.islice(self._por_id.values(), inicio, inicio + por_pagina))
+        self._recorridos("listar", len(mostrados))
+        if formato == "texto":
+            if pagina is None:
+                print("Lista de productos:", file=salida)
+            else:
+                total = -(-len(self._por_id) // por_pagina)
+                print(f"Lista de productos (página {pagina + 1} de {total}):", file=salida)
+        escribir_en_lotes(formatear_productos(mostrados, formato), salida)
+        if formato == "texto" and pagina is None:
+            print("Productos listados correctamente.", file=salida)
+        return mostrados
+
+    @_lectura
+    def exportar(self, ruta, formato=None):   #exporta el inventario a CSV o JSON Lines según la extensión
+        formato = formato or os.path.splitext(ruta)[1].lstrip(".")
+        if formato not in ("csv", "jsonl"):
+            raise ValueError("La exportación admite los formatos 'csv' y 'jsonl'.")
+        with open(ruta, 'w', newline='', encoding='utf-8') as file:
+            escribir_en_lotes(formatear_productos(self._por_id.values(), formato), file)
+        self._recorridos("exportar", len(self._por_id))
+        return len(self._por_id)
+
+    def __len__(self):
+        if self._diferido is not None:
+            return len(self._diferido)
+        return len(self._por_id)
+
+    def __iter__(self):   #en modo perezoso construye los productos de a uno, sin cargarlos todos
+        diferido = self._diferido
+        if diferido is None:
+            return iter(self.productos)
+        return (diferido.cache.get(item.get("id")) or producto_desde_dict(item) for item in self.almacen.cargar())
 
+    def _materializar(self):   #sale del modo perezoso: construye todos los productos e índices
+        with self._cerrojo.escritura() if self._cerrojo is not None else nullcontext():
+            diferido, self._diferido = self._diferido, None
+            if diferido is None:
+                return
+            # Se reutilizan los productos ya entregados por buscar_por_id
+            registros = (diferido.cache.get(item.get("id")) or item for item in self.almacen.cargar())
+            self._cargar(registros)
+            diferido.cerrar()
+
+    @_lectura
+    def estadisticas(self):   #totales precalculados: no recorre el inventario
+        agregados = self._agregados
+        return {
+            "productos": len(self._por_id),
+            "valor_total": round(agregados.valor_total, 2),
+            "productos_por_tipo": dict(agregados.productos_por_tipo),
+            "unidades_por_tipo": dict(agregados.unidades_por_tipo),
+            "productos_por_genero": dict(agregados.productos_por_genero),
+            "unidades_por_genero": dict(agregados.unidades_por_genero),
+            "stock_bajo": agregados.cantidad_stock_bajo(),
+        }
+
+    @_lectura
+    def stock_bajo(self):   #productos con stock en o bajo el umbral, de menor a mayor
+        return [self._por_id[id_producto] for id_producto, _ in self._agregados.stock_bajo()]
+
+    @_lectura
+    def menor_stock(self, cantidad=10):
+        return [self._por_id[id_producto] for id_producto, _ in self._agregados.menor_stock(cantidad)]
+
+    @_lectura
+    def vista_columnar(self):   #instantánea columnar (NumPy) del inventario
+        return VistaColumnar(self._por_id.values())
+
+    @_escritura
+    def aplicar_columnas(self, vista):   #confirma en un solo lote los precios y stocks cambiados en la vista
+        filas = vista.cambios()
+        ids = vista.id[filas].tolist()
+        precios = vista.precio[filas].tolist()
+        stocks = vista.stock[filas].tolist()
+        precios_originales = vista._precio_original[filas].tolist()
+        stocks_originales = vista._stock_original[filas].tolist()
+        # Se valida todo antes de tocar un solo producto. Por fila se escribe solo la columna que
+        # cambió en la vista, y si ese valor cambió en el inventario desde la instantánea (una
+        # venta, otro ajuste) se rechaza el lote para no pisar esa actualización
+        cambios = []
+        for id_producto, precio, stock, precio_original, stock_original in zip(
+                ids, precios, stocks, precios_originales, stocks_originales):
+            producto = self._por_id.get(id_producto)
+            if producto is None:
+                raise ValueError(f"No existe un producto con el ID {id_producto}.")
+            if precio < 0 or stock < 0:
+                raise ValueError(f"El precio y el stock del producto {id_producto} no pueden ser negativos.")
+            nuevo_precio = precio if precio != precio_original else None
+            nuevo_stock = stock if stock != stock_original else None
+            if (nuevo_precio is not None and producto.precio != precio_original
+                    or nuevo_stock is not None and producto.stock != stock_original):
+                raise ValueError(f"El producto {id_producto} cambió después de crear la vista; "
+                                 "vuelva a crearla con vista_columnar().")
+            cambios.append((producto, nuevo_precio, nuevo_stock))
+        for producto, precio, stock in cambios:
+            self._agregados.quitar(producto)
+            if precio is not None:
+                producto.precio = precio
+            if stock is not None:
+                producto.stock = stock
+            self._agregados.agregar(producto)
+        if cambios:
+            self._persistir([("actualizar", producto) for producto, _, _ in cambios])
+        vista._precio_original[filas] = vista.precio[filas]
+        vista._stock_original[filas] = vista.stock[filas]
+        return len(cambios)
+
+    @functools.partial(_lectura, materializar=False)
     def buscar_por_id(self, id_producto): #3 Buscar producto por ID
-        for producto in self.productos:
-            if producto.id == id_producto:
-                return producto
-        return None
+        if self._diferido is not None:
+            return self._diferido.obtener(id_producto)
+        return self._por_id.get(id_producto)
 
+    @_lectura
+    def buscar_por_nombre(self, tipo, nombre):
+        id_producto = self._por_clave.get((tipo, nombre))
+        return None if id_producto is None else self._por_id[id_producto]
+
+    @_lectura
+    def buscar_por_campo(self, campo, valor, tipo=None):   #Búsqueda por artista, autor, género o tema
+        if self._secundarios is None:
+            raise ValueError("El inventario se creó sin índices secundarios.")
+        tipos = [tipo] if tipo is not None else list(self._secundarios)
+        encontrados = []
+        for t in tipos:
+            indice = self._secundarios.get(t, {}).get(campo)
+            if indice is None:
+                continue
+            encontrados.extend(self._por_id[i] for i in indice.get(valor, ()))
+        self._recorridos("buscar_por_campo", len(encontrados))
+        return encontrados
+
+    @_lectura
+    def buscar_texto(self, consulta, limite=10):   #Búsqueda parcial sin distinguir mayúsculas ni tildes, por relevancia
+        if self._texto is None:
+            raise ValueError("El inventario se creó sin índice de texto.")
+        return [self._por_id[id_producto] for id_producto, _ in self._texto.buscar(consulta, limite)]
+
+    @_lectura
+    def autocompletar(self, prefijo, limite=10):
+        if self._texto is None:
+            raise ValueError("El inventario se creó sin índice de texto.")
+        return self._texto.autocompletar(prefijo, limite)
+
+    @_lectura
+    def consultar(self, tipo=None, orden=None, descendente=False, limite=None, desplazamiento=0,
+                  despues_de=None, precio_min=None, precio_max=None, stock_min=None, stock_max=None,
+                  donde=None, **campos):   #Consulta con filtros, orden y paginación; devuelve un iterador perezoso
+        # campos: igualdad sobre cualquier atributo (genero="rock", autor=...); donde: función extra.
+        # Paginación por limite/desplazamiento o por cursor: despues_de=Inventario.cursor(ultimo, orden).
+        for campo in list(campos) + ([orden] if orden is not None else []):
+            if campo not in CAMPOS_CONSULTABLES:
+                raise ValueError(f"No se puede consultar por el campo {campo}.")
+        ids = self._candidatos(tipo, campos)  # Se toma bajo el cerrojo; el resto se evalúa al iterar
+        return self._ejecutar_consulta(ids, tipo, campos, precio_min, precio_max, stock_min, stock_max,
+                                       donde, orden, descendente, limite, desplazamiento, despues_de)
+
+    @staticmethod
+    def cursor(producto, orden="id"):   #posición de un producto para pedir la página siguiente
+        valor = getattr(producto, orden, None)
+        return (valor is None, valor, producto.id)
+
+    def _candidatos(self, tipo, campos):   #ids a revisar: el índice más chico que aplique o todo el inventario
+        mejor = None
+        if self._secundarios is not None:
+            tipos = [tipo] if tipo is not None else list(CAMPOS_POR_TIPO)
+            for campo, valor in campos.items():
+                con_campo = [t for t in tipos if campo in CAMPOS_POR_TIPO.get(t, ())]
+                if not con_campo or not all(campo in self._secundarios.get(t, {}) for t in con_campo):
+                    continue
+                ids = set()
+                for t in con_campo:
+                    ids.update(self._secundarios[t][campo].get(valor, ()))
+                if mejor is None or len(ids) < len(mejor):
+                    mejor = ids
+        if mejor is not None:
+            return sorted(mejor)
+        if tipo is not None:
+            return list(self._por_tipo.get(tipo, ()))
+        return list(self._por_id)
+
+    def _ejecutar_consulta(self, ids, tipo, campos, precio_min, precio_max, stock_min, stock_max,
+                           donde, orden, descendente, limite, desplazamiento, despues_de):
+        def coincide(producto):
+            if tipo is not None and producto.tipo != tipo:
+                return False
+            for campo, valor in campos.items():
+                if getattr(producto, campo, None) != valor:
+                    return False
+            if precio_min is not None and producto.precio < precio_min:
+                return False
+            if precio_max is not None and producto.precio > precio_max:
+                return False
+            if stock_min is not None and producto.stock < stock_min:
+                return False
+            if stock_max is not None and producto.stock > stock_max:
+                return False
+            return donde is None or donde(producto)
+
+        candidatos = map(self._por_id.get, ids)
+        if self._metricas is not None:
+            candidatos = self._contar_recorridos(candidatos, "consultar")
+        productos = (p for p in candidatos if p is not None and coincide(p))
+        if orden is not None or despues_de is not None:
+            orden = orden or "id"
+            clave = functools.partial(self.cursor, orden=orden)
+            if despues_de is not None:
+                despues_de = tuple(despues_de)
+                if descendente:
+                    productos = (p for p in productos if clave(p) < despues_de)
+                else:
+                    productos = (p for p in productos if clave(p) > despues_de)
+            if limite is not None:  # Solo hace falta ordenar los primeros desplazamiento + limite
+                elegir = heapq.nlargest if descendente else heapq.nsmallest
+                productos = elegir(desplazamiento + limite, productos, key=clave)
+            else:
+                productos = sorted(productos, key=clave, reverse=descendente)
+        yield from itertools.islice(productos, desplazamiento, None if limite is None else desplazamiento + limite)
+
+    def _contar_recorridos(self, productos, operacion):   #cuenta los productos a medida que se iteran
+        recorridos = 0
+        try:
+            for producto in productos:
+                recorridos += 1
+                yield producto
+        finally:
+            self._recorridos(operacion, recorridos)
+
+    @_escritura
     def actualizar(self, id_producto, nuevos_datos): #4 Actualizar producto
         if not isinstance(nuevos_datos, dict):
             raise TypeError("Los nuevos datos deben ser un diccionario.")
@@ -289,89 +1718,194 @@ class Inventario:       #METODOS DE CRUD
             raise ValueError("Los nuevos datos no pueden estar vacíos.")
         if "id" in nuevos_datos and nuevos_datos["id"] != id_producto:
             raise ValueError("No se puede cambiar el ID del producto.")
-        if "tipo" in nuevos_datos and nuevos_datos["tipo"] not in ["disco", "libro", "revista"]:
-            raise ValueError("El tipo de producto debe ser 'disco', 'libro' o 'revista'.")
-        if "stock" in nuevos_datos and nuevos_datos["stock"] < 0:
-            raise ValueError("El stock no puede ser negativo.")
-        if "precio" in nuevos_datos and nuevos_datos["precio"] < 0:
-            raise ValueError("El precio no puede ser negativo.")
-        if "nombre" in nuevos_datos and not nuevos_datos["nombre"]:
-            raise ValueError("El nombre del producto no puede estar vacío.")
-        if "tipo" in nuevos_datos:
-            if nuevos_datos["tipo"] == "disco":
-                if not isinstance(nuevos_datos, Discos):
-                    raise TypeError("El producto debe ser una instancia de Discos.")
-                if not nuevos_datos.get("artista") or not nuevos_datos.get("genero"):
-                    raise ValueError("El disco debe tener un artista y un género.")
-            elif nuevos_datos["tipo"] == "libro":
-                if not isinstance(nuevos_datos, Libro):
-                    raise TypeError("El producto debe ser una instancia de Libro.")
-                if not nuevos_datos.get("autor") or not nuevos_datos.get("genero"):
-                    raise ValueError("El libro debe tener un autor y un género.")
-            elif nuevos_datos["tipo"] == "revista":
-                if not isinstance(nuevos_datos, Revistas):
-                    raise TypeError("El producto debe ser una instancia de Revistas.")
-                if not nuevos_datos.get("tema") or not nuevos_datos.get("periodicidad"):
-                    raise ValueError("La revista debe tener un tema y una periodicidad.")
-        if "id" in nuevos_datos:
-            for producto in self.productos:
-                if producto.id == nuevos_datos["id"] and producto.id != id_producto:
-                    raise ValueError(f"Ya existe un producto con el ID {nuevos_datos['id']}.")
-        if "tipo" in nuevos_datos:
-            for producto in self.productos:
-                if (producto.tipo == nuevos_datos["tipo"] and
-                    producto.nombre == nuevos_datos.get("nombre", producto.nombre) and
-                    producto.id != id_producto):
-                    raise ValueError(f"Ya existe un producto del tipo {nuevos_datos['tipo']} con el nombre {nuevos_datos.get('nombre', producto.nombre)}.")
+        if "tipo" in nuevos_datos and nuevos_datos["tipo"] not in TIPOS_PRODUCTO:
+            raise ValueError(mensaje_tipos_validos())
         # Actualizar el producto
         if not id_producto:
             raise ValueError("El ID del producto a actualizar no puede ser None.")
         producto = self.buscar_por_id(id_producto)
         if producto:    # Si el producto existe, actualizamos sus atributos
-            for key, value in nuevos_datos.items():
-                setattr(producto, key, value)
-                print(f"Producto {producto.nombre} actualizado correctamente.")
-            self.guardar_productos_json()  # Guardar automáticamente después de actualizar
+            tipo = TIPOS_PRODUCTO[nuevos_datos.get("tipo", producto.tipo)]
+            campos_validos = Productos.__slots__ + tipo.campos
+            for key in nuevos_datos:
+                if key not in campos_validos:
+                    raise ValueError(f"El campo {key} no es válido para un producto del tipo {tipo.nombre}.")
+            # Se valida el producto resultante antes de tocar nada: con el mismo esquema que crear
+            datos = producto.to_dict()
+            if tipo.nombre != producto.tipo:  # Cambio de tipo: los campos del tipo anterior no pasan
+                datos = {campo: datos[campo] for campo in Productos.__slots__}
+            datos.update(nuevos_datos)
+            try:
+                resultado = tipo.desde_dict(datos)
+            except KeyError:
+                raise ValueError(tipo.mensaje_requeridos)
+            tipo.validar(resultado)
+            if "tipo" in nuevos_datos or "nombre" in nuevos_datos:
+                clave = (tipo.nombre, resultado.nombre)
+                if self._por_clave.get(clave, id_producto) != id_producto:
+                    raise ValueError(f"Ya existe un producto del tipo {clave[0]} con el nombre {clave[1]}.")
+            self._desindexar_campos(producto)
+            if tipo.nombre != producto.tipo:
+                producto = resultado  # Instancia de la clase nueva, en la misma posición del inventario
+                self._por_id[id_producto] = producto
+            else:
+                for key, value in nuevos_datos.items():
+                    setattr(producto, key, value)
+            print(f"Producto {producto.nombre} actualizado correctamente.")
+            self._indexar_campos(producto)
+            self._persistir([("actualizar", producto)])  # Guardar automáticamente después de actualizar
             return True
         return False
 
+    @_escritura
     def eliminar(self, id_producto):  #5 Eliminar producto
         producto = self.buscar_por_id(id_producto)
         if producto:
-            self.productos.remove(producto)
+            self._desindexar(producto)
             print(f"Producto {producto.nombre} eliminado correctamente.")
-            self.guardar_productos_json()  # Guardar automáticamente después de eliminar
+            self._persistir([("eliminar", producto)])  # Guardar automáticamente después de eliminar
             return True
         return False
 
+    @_escritura
+    def ajustar_stock(self, id_producto, delta):   #lectura-modificación-escritura atómica del stock
+        producto = self.buscar_por_id(id_producto)
+        if producto is None:
+            raise ValueError(f"No existe un producto con el ID {id_producto}.")
+        nuevo_stock = producto.stock + delta
+        if nuevo_stock < 0:
+            raise ValueError("El stock no puede ser negativo.")
+        self._agregados.quitar(producto)
+        producto.stock = nuevo_stock
+        self._agregados.agregar(producto)
+        self._persistir([("actualizar", producto)])
+        return nuevo_stock
+
+    @_escritura
+    def mover_stock(self, movimientos):   #Movimientos de stock en lote: (id, delta, motivo)
+        # Todo o nada: se valida el lote completo contra el índice, acumulando los deltas de
+        # un mismo producto, y solo si no hubo rechazos se aplica y se guarda una única vez.
+        saldos = {}
+        aplicados = []
+        rechazados = []
+        for indice, movimiento in enumerate(movimientos):
+            try:
+                id_producto, delta, motivo = movimiento if len(movimiento) == 3 else (*movimiento, None)
+            except (TypeError, ValueError):
+                rechazados.append((indice, "El movimiento debe ser (id, delta, motivo)."))
+                continue
+            try:
+                producto = self._por_id.get(id_producto)
+            except TypeError:  # Un id no hashable (lista, diccionario) es un rechazo más del lote
+                rechazados.append((indice, f"ID de producto no válido: {id_producto!r}."))
+                continue
+            if producto is None:
+                rechazados.append((indice, f"No existe un producto con el ID {id_producto}."))
+                continue
+            if not isinstance(delta, int) or isinstance(delta, bool):
+                rechazados.append((indice, "La cantidad del movimiento debe ser un número entero."))
+                continue
+            saldo = saldos.get(id_producto, producto.stock) + delta
+            if saldo < 0:
+                rechazados.append((indice, f"El stock de {producto.nombre} quedaría negativo ({saldo})."))
+                continue
+            saldos[id_producto] = saldo
+            aplicados.append((indice, id_producto, delta, motivo))
+
+        if rechazados:
+            return {"confirmado": False, "aplicados": [], "rechazados": rechazados}
+        for id_producto, saldo in saldos.items():
+            producto = self._por_id[id_producto]
+            self._agregados.quitar(producto)
+            producto.stock = saldo
+            self._agregados.agregar(producto)
+        if saldos:
+            self._persistir([("actualizar", self._por_id[id_producto]) for id_producto in saldos])
+        return {"confirmado": True, "aplicados": aplicados, "rechazados": []}
+
+    def _persistir(self, cambios):   #envía los cambios al almacenamiento configurado
+        if self._pendientes is not None:
+            # Se retiene una copia del estado de este momento: si el producto vuelve a cambiar
+            # antes de guardar, cada cambio se aplica en orden con sus propios valores (con
+            # referencias vivas, renombres cruzados violarían la unicidad de (tipo, nombre))
+            self._pendientes.extend((operacion, producto_desde_dict(producto.to_dict()))
+                                    for operacion, producto in cambios)
+            return
+        self._guardar_cambios(cambios)
+
+    def _guardar_cambios(self, cambios, productos=None):   #productos: instantánea si se guarda desde otro hilo
+        productos = self._por_id.values() if productos is None else productos
+        if self._metricas is None:
+            self.almacen.guardar_cambios(cambios, productos)
+            return
+        with self._metricas.medir("persistir"):
+            self.almacen.guardar_cambios(cambios, productos)
+        self._metricas.contar("cambios_persistidos", len(cambios))
+
+    @contextmanager
+    def guardado_diferido(self):   #los cambios hechos dentro del bloque se guardan juntos al salir
+        if self._pendientes is not None:  # Bloque anidado: guarda el más externo
+            yield
+            return
+        self._pendientes = []
+        try:
+            yield
+        finally:
+            # Si el guardado falla, los cambios siguen retenidos: confirmar_pendientes() reintenta
+            self.confirmar_pendientes()
+            self._pendientes = None
+
+    @_escritura
+    def confirmar_pendientes(self):   #una única escritura con todos los cambios retenidos
+        pendientes = self._pendientes
+        if pendientes:
+            self._pendientes = []
+            try:
+                self._guardar_cambios(pendientes)
+            except Exception:
+                self._pendientes[:0] = pendientes  # Siguen pendientes para el próximo intento
+                raise
+
+    @_escritura
     def guardar_productos_json(self): #6 Guardar productos en JSON
-        if not self.productos:
+        if not self._por_id:
             print("No hay productos para guardar.")
             return
-        if not os.path.exists(os.path.dirname(self.file_path)) and os.path.dirname(self.file_path):
-            os.makedirs(os.path.dirname(self.file_path))
-        if not self.file_path.endswith('.json'):
-            raise ValueError("La ruta del archivo debe terminar con '.json'.")
-        with open(self.file_path, 'w') as file:
-            json.dump([producto.to_dict() for producto in self.productos], file, indent=4)
+        self.almacen.guardar_todo(self._por_id.values())
+
+    @_escritura
+    def sincronizar(self):   #fuerza a disco los cambios pendientes (modo journal)
+        self.almacen.sincronizar()
+
+    @_escritura
+    def compactar(self):   #pliega el log de cambios en un snapshot completo
+        self.almacen.guardar_todo(self._por_id.values())
+
+    @_escritura
+    def cerrar(self):
+        self.almacen.cerrar()
+        if self._metricas is not None:
+            self._metricas.volcar()
+
+    def _cargar(self, registros):
+        resultado = self.cargar_lote(registros, guardar=False)  # El almacenamiento ya contiene estos datos
+        if resultado["rechazados"]:
+            print(f"Se rechazaron {len(resultado['rechazados'])} registros de {self.file_path}:")
+            for indice, motivo in resultado["rechazados"][:10]:
+                print(f"  Registro {indice}: {motivo}")
 
+    @_escritura
     def cargar_productos_json(self):  #7 Cargar productos desde JSON
-        if not os.path.exists(self.file_path):
+        if not self.almacen.existe():
             print(f"El archivo {self.file_path} no existe. Iniciando con un inventario vacío.")
             return
         try:
-            with open(self.file_path, 'r') as file:
-                data = json.load(file)
-                for item in data:
-                    if item['tipo'] == 'disco':
-                        producto = Discos.from_dict(item)
-                    elif item['tipo'] == 'libro':
-                        producto = Libro.from_dict(item)
-                    elif item['tipo'] == 'revista':
-                        producto = Revistas.from_dict(item)
-                    else:
-                        continue
-                    self.crear(producto)
+            if self.perezoso and not self._por_id:
+                self._diferido = self.almacen.abrir_indexado()
+                if self._diferido is not None:
+                    self._ids.observar(self._diferido.max_id())
+                    return
+            self._cargar(self.almacen.cargar())
         except json.JSONDecodeError:
             print(f"Error al decodificar el archivo {self.file_path}. Asegúrese de que el formato sea correcto.")
         except FileNotFoundError:
@@ -380,6 +1914,233 @@ class Inventario:       #METODOS DE CRUD
             print(f"Error al cargar productos desde {self.file_path}: {e}")
             
 
+class InventarioAsincrono:     #API asyncio sobre Inventario: nada de E/S bloqueante en el bucle de eventos
+    # Los cambios se aplican en memoria dentro del bucle (son O(1) sobre los índices) y quedan
+    # retenidos en inventario._pendientes. Un único escritor los guarda en un executor: todos los
+    # cambios llegados mientras se espera o se escribe el grupo anterior salen en una sola escritura
+    # (group commit). Cada operación responde recién cuando su grupo quedó guardado.
+    # Las lecturas van directo a los índices en memoria, sin pasar por el executor.
+    def __init__(self, inventario, executor=None, espera_grupo=0.001):
+        if inventario._diferido is not None:
+            inventario._materializar()  # Las lecturas no deben cargar el archivo dentro del bucle
+        self.inventario = inventario
+        self.executor = executor
+        self.espera_grupo = espera_grupo   # segundos que se esperan para juntar más cambios
+        self.grupos_guardados = 0
+        self._grupo = None      # futuro del grupo que todavía junta cambios
+        self._escritor = None   # tarea que guarda los grupos de a uno
+        self._guardando = asyncio.Lock()   # un solo guardado a la vez en el executor (grupos y completos)
+        inventario._pendientes = []
+
+    @classmethod
+    async def abrir(cls, *args, executor=None, espera_grupo=0.001, **kwargs):   #crea el Inventario en el executor
+        loop = asyncio.get_running_loop()
+        inventario = await loop.run_in_executor(executor, functools.partial(Inventario, *args, **kwargs))
+        if inventario._diferido is not None:
+            await loop.run_in_executor(executor, inventario._materializar)
+        return cls(inventario, executor, espera_grupo)
+
+    async def _confirmar(self):   #espera a que se guarde el grupo con los cambios ya aplicados
+        if not self.inventario._pendientes:
+            return
+        if self._grupo is None:
+            self._grupo = asyncio.get_running_loop().create_future()
+        grupo = self._grupo
+        if self._escritor is None or self._escritor.done():
+            self._escritor = asyncio.ensure_future(self._escribir_grupos())
+        await asyncio.shield(grupo)
+
+    async def _escribir_grupos(self):
+        loop = asyncio.get_running_loop()
+        inventario = self.inventario
+        while inventario._pendientes:
+            if self.espera_grupo:
+                await asyncio.sleep(self.espera_grupo)
+            grupo, self._grupo = self._grupo or loop.create_future(), None
+            cambios, inventario._pendientes = inventario._pendientes, []
+            async with self._guardando:
+                try:
+                    await loop.run_in_executor(self.executor, inventario._guardar_cambios, cambios,
+                                               self._productos_actuales())
+                except Exception as e:
+                    # El grupo no se descarta: se reescribe todo desde memoria y, si tampoco se
+                    # puede, los cambios vuelven a la cola y el próximo cambio reintenta
+                    logging.getLogger("inventario").warning("Falló el guardado de %d cambios: %s", len(cambios), e)
+                    try:
+                        await loop.run_in_executor(self.executor, inventario.almacen.guardar_todo,
+                                                   self._productos_actuales())
+                    except Exception:
+                        inventario._pendientes[:0] = cambios
+                        grupo.set_exception(e)
+                        # Quienes se sumaron al grupo siguiente durante el guardado tampoco
+                        # quedaron guardados: se les avisa en lugar de dejarlos esperando
+                        if self._grupo is not None:
+                            self._grupo.set_exception(e)
+                            self._grupo = None
+                        return
+            self.grupos_guardados += 1
+            grupo.set_result(len(cambios))
+
+    def _productos_actuales(self):
+        # Instantánea de la lista (no de los productos): el bucle puede agregar o quitar
+        # productos mientras el executor escribe
+        return list(self.inventario._por_id.values())
+
+    async def crear(self, producto):
+        producto = self.inventario.crear(producto)
+        await self._confirmar()
+        return producto
+
+    async def cargar_lote(self, registros):
+        resultado = self.inventario.cargar_lote(registros)
+        await self._confirmar()
+        return resultado
+
+    async def actualizar(self, id_producto, nuevos_datos):
+        actualizado = self.inventario.actualizar(id_producto, nuevos_datos)
+        await self._confirmar()
+        return actualizado
+
+    async def eliminar(self, id_producto):
+        eliminado = self.inventario.eliminar(id_producto)
+        await self._confirmar()
+        return eliminado
+
+    async def ajustar_stock(self, id_producto, delta):
+        stock = self.inventario.ajustar_stock(id_producto, delta)
+        await self._confirmar()
+        return stock
+
+    async def mover_stock(self, movimientos):
+        resultado = self.inventario.mover_stock(movimientos)
+        await self._confirmar()
+        return resultado
+
+    async def buscar_por_id(self, id_producto):
+        return self.inventario.buscar_por_id(id_producto)
+
+    async def consultar(self, **filtros):   #lista ya evaluada (ver Inventario.consultar)
+        return list(self.inventario.consultar(**filtros))
+
+    async def buscar_texto(self, consulta, limite=10):
+        return self.inventario.buscar_texto(consulta, limite)
+
+    async def estadisticas(self):
+        return self.inventario.estadisticas()
+
+    async def guardar_productos_json(self):   #reescritura completa, fuera del bucle y sin pisarse con los grupos
+        await self._confirmar()
+        async with self._guardando:
+            productos = self._productos_actuales()
+            if not productos:
+                print("No hay productos para guardar.")
+                return
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.inventario.almacen.guardar_todo,
+                                                             productos)
+
+    async def cerrar(self):
+        await self._confirmar()
+        if self._escritor is not None:
+            await self._escritor
+        async with self._guardando:
+            self.inventario._pendientes = None
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.inventario.cerrar)
+
+ESTADOS_HTTP = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+PARAMETROS_CONSULTA = {"limite": int, "desplazamiento": int, "precio_min": float, "precio_max": float,
+                       "stock_min": int, "stock_max": int}
+
+async def atender_peticion(servicio, metodo, destino, cuerpo):   #(estado HTTP, respuesta JSON) de una petición
+    # GET /productos?tipo=&genero=&orden=&desc=1&limite=&texto=  GET/PATCH/DELETE /productos/<id>
+    # POST /productos  POST /productos/<id>/stock {"delta": n}  GET /estadisticas
+    url = urlsplit(destino)
+    partes = [parte for parte in url.path.split("/") if parte]
+    try:
+        datos = json.loads(cuerpo) if cuerpo else None
+        if partes == ["estadisticas"] and metodo == "GET":
+            return 200, await servicio.estadisticas()
+        if partes[:1] != ["productos"] or len(partes) > 3:
+            return 404, {"error": "Ruta inexistente."}
+        if len(partes) == 1:
+            if metodo == "POST":
+                producto = await servicio.crear(producto_desde_dict(datos))
+                return 201, producto.to_dict()
+            if metodo != "GET":
+                return 405, {"error": f"Método {metodo} no admitido."}
+            parametros = dict(parse_qsl(url.query))
+            if "texto" in parametros:
+                encontrados = await servicio.buscar_texto(parametros["texto"], int(parametros.get("limite", 10)))
+                return 200, [producto.to_dict() for producto in encontrados]
+            filtros = {nombre: convertir(parametros.pop(nombre))
+                       for nombre, convertir in PARAMETROS_CONSULTA.items() if nombre in parametros}
+            filtros.setdefault("limite", 100)
+            filtros["descendente"] = parametros.pop("desc", "") in ("1", "true")
+            filtros.update(_tipar_fila_csv(parametros))
+            return 200, [producto.to_dict() for producto in await servicio.consultar(**filtros)]
+        id_producto = int(partes[1])
+        if len(partes) == 3:
+            if partes[2] != "stock" or metodo != "POST":
+                return 404, {"error": "Ruta inexistente."}
+            return 200, {"id": id_producto, "stock": await servicio.ajustar_stock(id_producto, datos["delta"])}
+        if metodo == "GET":
+            producto = await servicio.buscar_por_id(id_producto)
+            if producto is None:
+                return 404, {"error": f"No existe un producto con el ID {id_producto}."}
+            return 200, producto.to_dict()
+        if metodo == "PATCH":
+            if not await servicio.actualizar(id_producto, datos):
+                return 404, {"error": f"No existe un producto con el ID {id_producto}."}
+            return 200, (await servicio.buscar_por_id(id_producto)).to_dict()
+        if metodo == "DELETE":
+            if not await servicio.eliminar(id_producto):
+                return 404, {"error": f"No existe un producto con el ID {id_producto}."}
+            return 200, {"id": id_producto, "eliminado": True}
+        return 405, {"error": f"Método {metodo} no admitido."}
+    except KeyError as e:
+        return 400, {"error": f"Falta el campo {e}."}
+    except (TypeError, ValueError) as e:
+        return 400, {"error": str(e)}
+
+async def _atender_conexion(servicio, lector, escritor):   #HTTP/1.1 mínimo con conexiones persistentes
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+            cabeceras = {}
+            while True:
+                linea = await lector.readline()
+                if linea in (b"\r\n", b"\n", b""):
+                    break
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                cabeceras[nombre.strip().lower()] = valor.strip()
+            largo = int(cabeceras.get("content-length", 0))
+            cuerpo = await lector.readexactly(largo) if largo else b""
+            try:
+                estado, respuesta = await atender_peticion(servicio, metodo, destino, cuerpo)
+            except Exception as e:
+                estado, respuesta = 500, {"error": str(e)}
+            datos = json.dumps(respuesta, ensure_ascii=False).encode("utf-8")
+            cerrar = cabeceras.get("connection", "").lower() == "close"
+            encabezado = (f"HTTP/1.1 {estado} {ESTADOS_HTTP[estado]}\r\n"
+                          f"Content-Type: application/json; charset=utf-8\r\n"
+                          f"Content-Length: {len(datos)}\r\n")
+            if cerrar:
+                encabezado += "Connection: close\r\n"
+            escritor.write(encabezado.encode("latin-1") + b"\r\n" + datos)
+            await escritor.drain()
+            if cerrar:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass  # Cliente desconectado o petición mal formada: se cierra la conexión
+    finally:
+        escritor.close()
+
+async def servir(servicio, host="127.0.0.1", puerto=8080):   #servidor HTTP/JSON sobre un InventarioAsincrono
+    return await asyncio.start_server(functools.partial(_atender_conexion, servicio), host, puerto)
+
 
 def menu():
     print("\nBienvenido al sistema de gestión de productos")
@@ -394,43 +2155,241 @@ def menu():
     return input("Seleccione una opción: ")
 
 
+def _tipar_fila_csv(fila):   #los valores de un CSV llegan como texto: se convierten los numéricos
+    registro = {}
+    for campo, valor in fila.items():
+        if valor is None or valor == "":
+            continue
+        if campo == "precio":
+            valor = float(valor)
+        elif campo in ("id", "stock", "delta"):
+            valor = int(valor)
+        registro[campo] = valor
+    return registro
+
+def leer_registros(ruta):   #(número de fila, registro o error) de un CSV, JSON Lines o arreglo JSON
+    if ruta.endswith(".csv"):
+        with open(ruta, newline="", encoding="utf-8") as file:
+            for numero, fila in enumerate(csv.DictReader(file), start=2):
+                try:
+                    yield numero, _tipar_fila_csv(fila)
+                except ValueError as e:
+                    yield numero, ValueError(f"Valor inválido: {e}")
+    elif ruta.endswith(".jsonl"):
+        with open(ruta, encoding="utf-8") as file:
+            for numero, linea in enumerate(file, start=1):
+                if linea.strip():
+                    try:
+                        yield numero, json.loads(linea)
+                    except json.JSONDecodeError as e:
+                        yield numero, ValueError(f"JSON inválido: {e}")
+    else:
+        with open(ruta, encoding="utf-8") as file:
+            yield from enumerate(iterar_arreglo_json(file), start=1)
+
+def procesar_en_lotes(filas, tamano_lote, aplicar, errores):   #aplica por lotes, informa progreso y junta los rechazos
+    # aplicar(registros) devuelve [(índice en el lote, motivo)]; errores recibe (fila, motivo)
+    procesadas = 0
+    rechazadas = 0
+    inicio = time.perf_counter()
+    while True:
+        lote = list(itertools.islice(filas, tamano_lote))
+        if not lote:
+            break
+        numeros = []
+        registros = []
+        for numero, registro in lote:
+            if isinstance(registro, Exception):
+                errores.append((numero, str(registro)))
+                rechazadas += 1
+            else:
+                numeros.append(numero)
+                registros.append(registro)
+        for indice, motivo in aplicar(registros):
+            errores.append((numeros[indice], motivo))
+            rechazadas += 1
+        procesadas += len(lote)
+        segundos = time.perf_counter() - inicio
+        print(f"\r{procesadas} filas procesadas ({procesadas / max(segundos, 1e-9):.0f} filas/s), "
+              f"{rechazadas} rechazadas", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return procesadas, rechazadas
+
+def _informar_errores(errores, ruta_reporte):
+    if ruta_reporte:
+        with open(ruta_reporte, "w", newline="", encoding="utf-8") as file:
+            escritor = csv.writer(file)
+            escritor.writerow(["fila", "motivo"])
+            escritor.writerows(errores)
+        print(f"Reporte de errores guardado en {ruta_reporte}.", file=sys.stderr)
+    else:
+        for numero, motivo in errores:
+            print(f"Fila {numero}: {motivo}", file=sys.stderr)
+
+async def _servir_cli(servicio, host, puerto):
+    servidor = await servir(servicio, host, puerto)
+    print(f"Sirviendo el inventario en http://{host}:{puerto} (Ctrl+C para terminar)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servicio.cerrar()
+
+def ejecutar_cli(argumentos):   #modo no interactivo: python main.py <comando> ...
+    parser = argparse.ArgumentParser(prog="main.py", description="Gestión de productos sin el menú interactivo.")
+    parser.add_argument("--archivo", default="productos.json", help="archivo JSON/JSONL del inventario")
+    parser.add_argument("--db", help="usar una base SQLite en lugar del archivo JSON")
+    parser.add_argument("--journal", action="store_true", help="guardar los cambios en un log de cambios")
+    parser.add_argument("--metricas", metavar="ARCHIVO.prom", help="escribir métricas en formato de texto de Prometheus")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="agrega productos desde un CSV, JSONL o JSON")
+    importar.add_argument("origen")
+    importar.add_argument("--lote", type=int, default=5000, help="filas validadas por lote")
+    importar.add_argument("--errores", help="CSV donde guardar las filas rechazadas")
+
+    exportar = comandos.add_parser("exportar", help="exporta el inventario a CSV o JSONL")
+    exportar.add_argument("destino")
+    exportar.add_argument("--formato", choices=("csv", "jsonl"))
+
+    consultar = comandos.add_parser("consultar", help="filtra, ordena y pagina el inventario")
+    consultar.add_argument("--tipo")
+    consultar.add_argument("--campo", action="append", default=[], metavar="CAMPO=VALOR")
+    consultar.add_argument("--texto", help="búsqueda de texto por nombre, artista, autor o tema")
+    consultar.add_argument("--precio-min", type=float)
+    consultar.add_argument("--precio-max", type=float)
+    consultar.add_argument("--stock-min", type=int)
+    consultar.add_argument("--stock-max", type=int)
+    consultar.add_argument("--orden")
+    consultar.add_argument("--desc", action="store_true")
+    consultar.add_argument("--limite", type=int)
+    consultar.add_argument("--desplazamiento", type=int, default=0)
+    consultar.add_argument("--formato", choices=FORMATOS_LISTADO, default="texto")
+
+    ajustar = comandos.add_parser("ajustar-stock", help="aplica movimientos de stock (id, delta, motivo)")
+    ajustar.add_argument("origen")
+    ajustar.add_argument("--lote", type=int, default=5000, help="movimientos por lote (cada lote es todo o nada)")
+    ajustar.add_argument("--errores", help="CSV donde guardar las filas rechazadas")
+
+    servidor = comandos.add_parser("servir", help="expone el inventario como servicio HTTP/JSON")
+    servidor.add_argument("--host", default="127.0.0.1")
+    servidor.add_argument("--puerto", type=int, default=8080)
+
+    migrar = comandos.add_parser("migrar", help="convierte un archivo JSON en una base SQLite")
+    migrar.add_argument("origen", nargs="?", default="productos.json")
+    migrar.add_argument("destino", nargs="?", default="productos.db")
+
+    args = parser.parse_args(argumentos)
+    if args.comando == "migrar":
+        migrar_json_a_sqlite(args.origen, args.destino)
+        return 0
+
+    almacen = AlmacenSQLite(args.db) if args.db else None
+    metricas = Metricas(SumideroPrometheus(args.metricas)) if args.metricas else None
+    inventario = Inventario(args.archivo, almacen=almacen, journal=args.journal, metricas=metricas,
+                            indice_texto=args.comando == "servir" or (args.comando == "consultar" and args.texto is not None))
+    if args.comando == "servir":
+        try:
+            asyncio.run(_servir_cli(InventarioAsincrono(inventario), args.host, args.puerto))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    try:
+        if args.comando == "importar":
+            errores = []
+            with inventario.guardado_diferido():  # Una sola escritura al terminar la importación
+                procesadas, rechazadas = procesar_en_lotes(
+                    leer_registros(args.origen), args.lote,
+                    lambda registros: inventario.cargar_lote(registros)["rechazados"], errores)
+            _informar_errores(errores, args.errores)
+            print(f"{procesadas - rechazadas} productos importados, {rechazadas} filas rechazadas.")
+            if rechazadas:
+                return 1
+        elif args.comando == "exportar":
+            cantidad = inventario.exportar(args.destino, args.formato)
+            print(f"{cantidad} productos exportados a {args.destino}.")
+        elif args.comando == "consultar":
+            try:
+                campos = {}
+                for filtro in args.campo:
+                    campo, _, valor = filtro.partition("=")
+                    campos[campo] = valor
+                campos = _tipar_fila_csv(campos)
+                if args.texto is not None:
+                    resultados = (p for p in inventario.buscar_texto(args.texto, limite=args.limite or 20)
+                                  if args.tipo is None or p.tipo == args.tipo)
+                else:
+                    resultados = inventario.consultar(
+                        tipo=args.tipo, orden=args.orden, descendente=args.desc, limite=args.limite,
+                        desplazamiento=args.desplazamiento, precio_min=args.precio_min, precio_max=args.precio_max,
+                        stock_min=args.stock_min, stock_max=args.stock_max, **campos)
+                escribir_en_lotes(formatear_productos(resultados, args.formato), sys.stdout)
+            except (TypeError, ValueError) as e:
+                print(f"Error en la consulta: {e}", file=sys.stderr)
+                return 2
+        elif args.comando == "ajustar-stock":
+            errores = []
+            def aplicar(registros):   #un lote rechazado no aplica ninguna fila: se informan todas
+                # Una fila que no es un objeto JSON llega a mover_stock como movimiento inválido
+                movimientos = [(r.get("id"), r.get("delta"), r.get("motivo")) if isinstance(r, dict) else None
+                               for r in registros]
+                rechazados = inventario.mover_stock(movimientos)["rechazados"]
+                if not rechazados:
+                    return []
+                con_motivo = dict(rechazados)
+                con_motivo.update((indice, "La fila debe ser un objeto JSON con id y delta.")
+                                  for indice, movimiento in enumerate(movimientos) if movimiento is None)
+                return [(indice, con_motivo.get(indice, "No aplicado: el lote tiene filas rechazadas."))
+                        for indice in range(len(registros))]
+            with inventario.guardado_diferido():
+                procesadas, rechazadas = procesar_en_lotes(leer_registros(args.origen), args.lote, aplicar, errores)
+            _informar_errores(errores, args.errores)
+            print(f"{procesadas} movimientos leídos, {rechazadas} no aplicados "
+                  "(los lotes con rechazos no se aplican).")
+            if rechazadas:
+                return 1
+    except (OSError, ValueError) as e:   # Archivo inexistente, formato desconocido, JSON corrupto...
+        print(f"No se pudo completar {args.comando}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        inventario.cerrar()
+    return 0
+
+
 # Ejecución del menú
 if __name__ == "__main__":
-    productos = Inventario()  # Crear una instancia de Inventario
+    if len(sys.argv) > 1:   # python main.py <comando> ...: modo por lotes, sin menú
+        sys.exit(ejecutar_cli(sys.argv[1:]))
+    productos = Inventario(perezoso=True)  # Crear una instancia de Inventario (carga los productos al iniciar)
     biblioteca = productos  # Asignar la instancia a una variable para usar en el menú
-    biblioteca.cargar_productos_json()  # Cargar productos al iniciar
     # Bucle del menú
 
     while True:
         opcion = menu()
 
         if opcion == "1":
-            tipo_producto = input("Ingrese el tipo de producto (disco, libro, revista): ").strip().lower()
+            tipo_producto = input(f"Ingrese el tipo de producto ({', '.join(TIPOS_PRODUCTO)}): ").strip().lower()
             nombre = input("Ingrese el nombre del producto: ").strip()
             precio = float(input("Ingrese el precio del producto: "))
             stock = int(input("Ingrese el stock del producto: "))
-            id_producto = len(biblioteca.productos) + 1
-            if tipo_producto == "disco":
-                artista = input("Ingrese el artista del disco: ").strip()
-                genero = input("Ingrese el género del disco: ").strip()
-                producto = Discos(nombre, precio, stock, id_producto, artista, genero)
-            elif tipo_producto == "libro":
-                autor = input("Ingrese el autor del libro: ").strip()
-                genero = input("Ingrese el género del libro: ").strip()
-                producto = Libro(nombre, precio, stock, id_producto, autor, genero)
-            elif tipo_producto == "revista":
-                tema = input("Ingrese el tema de la revista: ").strip()
-                periodicidad = input("Ingrese la periodicidad de la revista: ").strip()
-                producto = Revistas(nombre, precio, stock, id_producto, tema, periodicidad)
-            else:
+            id_producto = None  # Lo asigna el inventario al crear el producto
+            tipo = TIPOS_PRODUCTO.get(tipo_producto)
+            if tipo is None:
                 print("Tipo de producto no válido.")
                 continue
+            propios = [input(f"Ingrese {tipo.pregunta(campo)}: ").strip() for campo in tipo.campos]
+            producto = tipo.clase(nombre, precio, stock, id_producto, *propios)
             try:
                 biblioteca.crear(producto)
             except (TypeError, ValueError) as e:
                 print(f"Error al agregar el producto: {e}")
         elif opcion == "2":
-            biblioteca.listar()
+            por_pagina = 20
+            pagina = 0
+            while biblioteca.listar(pagina=pagina, por_pagina=por_pagina) and (pagina + 1) * por_pagina < len(biblioteca):
+                if input("Enter para ver la página siguiente, 'q' para volver al menú: ").strip().lower() == "q":
+                    break
+                pagina += 1
         elif opcion == "3":
             id_producto = int(input("Ingrese el ID del producto a buscar: "))
             producto = biblioteca.buscar_por_id(id_producto)
@@ -453,21 +2412,9 @@ if __name__ == "__main__":
             tipo_producto = input("Ingrese el nuevo tipo de producto (deje en blanco para no cambiar): ").strip().lower()
             if tipo_producto:
                 nuevos_datos["tipo"] = tipo_producto
-                if tipo_producto == "disco":
-                    artista = input("Ingrese el nuevo artista del disco: ").strip()
-                    genero = input("Ingrese el nuevo género del disco: ").strip()
-                    nuevos_datos["artista"] = artista
-                    nuevos_datos["genero"] = genero
-                elif tipo_producto == "libro":
-                    autor = input("Ingrese el nuevo autor del libro: ").strip()
-                    genero = input("Ingrese el nuevo género del libro: ").strip()
-                    nuevos_datos["autor"] = autor
-                    nuevos_datos["genero"] = genero
-                elif tipo_producto == "revista":
-                    tema = input("Ingrese el nuevo tema de la revista: ").strip()
-                    periodicidad = input("Ingrese la nueva periodicidad de la revista: ").strip()
-                    nuevos_datos["tema"] = tema
-                    nuevos_datos["periodicidad"] = periodicidad
+                tipo = TIPOS_PRODUCTO.get(tipo_producto)
+                for campo in tipo.campos if tipo is not None else ():
+                    nuevos_datos[campo] = input(f"Ingrese {tipo.pregunta(campo, nuevo=True)}: ").strip()
             try:
                 biblioteca.actualizar(id_producto, nuevos_datos)
             except (TypeError, ValueError) as e: